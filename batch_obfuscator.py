@@ -0,0 +1,415 @@
+"""
+Batch obfuscation untuk arsip project (zip/tar)
+Member dibaca satu per satu tanpa extract ke disk, file .py dikirim ke
+worker secara paralel, file lain disalin apa adanya ke arsip output.
+File .py yang gagal diobfuscate juga disalin apa adanya (arsip tetap
+lengkap) dan dicatat di BatchReport.failed supaya bisa ditandai ke user.
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+import time
+import posixpath
+from collections import deque
+from concurrent.futures import Future
+from typing import BinaryIO, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+# Ekstensi arsip -> (format, mode tulis tarfile / compression zipfile)
+ARCHIVE_FORMATS = {
+    '.zip': ('zip', zipfile.ZIP_DEFLATED),
+    '.tar': ('tar', 'w'),
+    '.tar.gz': ('tar', 'w:gz'),
+    '.tgz': ('tar', 'w:gz'),
+    '.tar.bz2': ('tar', 'w:bz2'),
+    '.tar.xz': ('tar', 'w:xz'),
+}
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# submit(code, nama_member) -> Future berisi source hasil obfuscation
+SubmitFn = Callable[[str, str], Future]
+
+# Path file atau file object biner (mis. io.BytesIO)
+Target = Union[str, BinaryIO]
+
+
+class ArchiveError(Exception):
+    """Arsip tidak valid atau melewati batas (zip bomb, terlalu banyak file, dll)"""
+
+
+def archive_format(filename: str) -> Optional[Tuple[str, object]]:
+    """Format arsip berdasarkan nama file, None kalau bukan arsip"""
+    name = filename.lower()
+    # Ekstensi terpanjang dulu supaya .tar.gz tidak terbaca sebagai .gz
+    for ext in sorted(ARCHIVE_FORMATS, key=len, reverse=True):
+        if name.endswith(ext):
+            return ARCHIVE_FORMATS[ext]
+    return None
+
+
+def is_archive(filename: str) -> bool:
+    return archive_format(filename) is not None
+
+
+def _safe_name(name: str) -> Optional[str]:
+    """Normalisasi path member: None untuk path absolut atau keluar dari root,
+    string kosong untuk root arsip itu sendiri"""
+    name = name.replace('\\', '/')
+    if name.startswith('/') or (len(name) > 1 and name[1] == ':'):
+        return None
+    normalized = posixpath.normpath(name)
+    if normalized == '..' or normalized.startswith('../'):
+        return None
+    return '' if normalized == '.' else normalized
+
+
+class BatchReport:
+    """Ringkasan satu arsip"""
+
+    def __init__(self):
+        self.obfuscated: List[str] = []
+        self.copied: List[str] = []
+        self.skipped: List[Tuple[str, str]] = []
+        # (nama, error): file .py yang disalin tanpa obfuscation
+        self.failed: List[Tuple[str, str]] = []
+
+    def summary(self) -> str:
+        text = f"{len(self.obfuscated)} file .py diobfuscate, {len(self.copied)} file lain disalin"
+        if self.skipped:
+            text += f", {len(self.skipped)} dilewati"
+        if self.failed:
+            text += f", {len(self.failed)} gagal (disalin tanpa obfuscation)"
+        return text
+
+    def to_dict(self) -> Dict:
+        return {
+            'obfuscated': len(self.obfuscated),
+            'copied': len(self.copied),
+            'skipped': self.skipped,
+            'failed': self.failed
+        }
+
+
+class ArchiveObfuscator:
+    """Obfuscate semua .py dalam arsip, hasil ditulis ke arsip baru dengan format sama"""
+
+    def __init__(self, submit: SubmitFn, max_members: int = 1000,
+                 max_total_size: int = 100 * 1024 * 1024,
+                 max_member_size: int = 10 * 1024 * 1024,
+                 max_ratio: float = 100.0, max_pending: int = 16,
+                 timeout: Optional[float] = None):
+        self.submit = submit
+        self.max_members = max_members
+        self.max_total_size = max_total_size
+        self.max_member_size = max_member_size
+        self.max_ratio = max_ratio
+        self.max_pending = max(1, max_pending)
+        # Batas waktu satu arsip (baca, tunggu job, tulis), None = tanpa batas
+        self.timeout = timeout
+
+    def process(self, source: Target, output: Target,
+                archive_name: Optional[str] = None) -> BatchReport:
+        """Proses arsip source ke output; format diambil dari archive_name
+        (default: nama source)
+
+        source/output boleh path atau file object biner. Output berupa path
+        ditulis lewat file sementara; file object ditulis langsung (isinya
+        tidak valid kalau terjadi error).
+        """
+        if archive_name is None and not isinstance(source, str):
+            raise ArchiveError("archive_name wajib untuk input berupa file object")
+        fmt = archive_format(archive_name or source)
+        if fmt is None:
+            raise ArchiveError("Format arsip tidak didukung")
+
+        kind, write_mode = fmt
+        self._total = 0
+        self._members = 0
+        self._compressed = 0
+        self._deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        tmp_path = f"{output}.{os.getpid()}.tmp" if isinstance(output, str) else None
+        try:
+            target = tmp_path or output
+            if kind == 'zip':
+                report = self._process_zip(source, target, write_mode)
+            else:
+                report = self._process_tar(source, target, write_mode)
+            if not report.obfuscated and not report.failed:
+                raise ArchiveError("Tidak ada file .py di dalam arsip")
+            if tmp_path:
+                os.replace(tmp_path, output)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, NotImplementedError) as e:
+            raise ArchiveError(f"Arsip rusak: {e}") from e
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return report
+
+    # ------------------------------------------------------------------
+    # Batas ukuran (zip bomb)
+    # ------------------------------------------------------------------
+
+    def _count_member(self, name: str):
+        self._members += 1
+        if self._members > self.max_members:
+            raise ArchiveError(f"Arsip berisi lebih dari {self.max_members} file")
+        self._check_deadline()
+
+    def _count_bytes(self, size: int):
+        self._total += size
+        if self._total > self.max_total_size:
+            raise ArchiveError(
+                f"Total isi arsip melebihi {self.max_total_size // 1024 // 1024}MB"
+            )
+        if self._compressed and self._total / self._compressed > self.max_ratio:
+            raise ArchiveError("Rasio kompresi arsip mencurigakan")
+
+    def _remaining(self) -> Optional[float]:
+        if self._deadline is None:
+            return None
+        return self._deadline - time.monotonic()
+
+    def _check_deadline(self):
+        remaining = self._remaining()
+        if remaining is not None and remaining <= 0:
+            raise ArchiveError(
+                f"Proses arsip melebihi batas waktu {self.timeout:g} detik"
+            )
+
+    def _read_member(self, name: str, src) -> bytes:
+        """Baca isi member dengan batas ukuran nyata (header bisa bohong)"""
+        data = src.read(self.max_member_size + 1)
+        if len(data) > self.max_member_size:
+            raise ArchiveError(f"{name} terlalu besar setelah diekstrak")
+        self._count_bytes(len(data))
+        return data
+
+    def _copy_member(self, name: str, src, dst):
+        while True:
+            chunk = src.read(COPY_BUFFER_SIZE)
+            if not chunk:
+                return
+            self._count_bytes(len(chunk))
+            self._check_deadline()
+            dst.write(chunk)
+
+    # ------------------------------------------------------------------
+    # Job .py paralel
+    # ------------------------------------------------------------------
+
+    def _submit(self, pending: Deque, name: str, data: bytes, report: BatchReport,
+                write: Callable[[str, bytes], None]):
+        try:
+            code = data.decode('utf-8')
+        except UnicodeDecodeError:
+            report.failed.append((name, "bukan teks UTF-8"))
+            write(name, data)
+            return
+
+        pending.append((name, data, self.submit(code, name)))
+        # Batasi job yang menunggu supaya memori tetap terbatas
+        while len(pending) >= self.max_pending:
+            self._drain_one(pending, report, write)
+
+    def _drain_one(self, pending: Deque, report: BatchReport,
+                   write: Callable[[str, bytes], None]):
+        name, data, future = pending.popleft()
+        remaining = self._remaining()
+        try:
+            result = future.result(None if remaining is None else max(remaining, 0))
+        except SyntaxError as e:
+            report.failed.append((name, f"error sintaks: {e}"))
+            write(name, data)
+            return
+        except Exception as e:
+            if not future.done():
+                # Batas waktu arsip habis sebelum job ini selesai
+                future.cancel()
+                raise ArchiveError(
+                    f"Proses arsip melebihi batas waktu {self.timeout:g} detik"
+                ) from None
+            report.failed.append((name, str(e) or type(e).__name__))
+            write(name, data)
+            return
+
+        write(name, result.encode('utf-8'))
+        report.obfuscated.append(name)
+
+    @staticmethod
+    def _cancel_all(pending: Deque):
+        """Berhenti karena error: job yang belum jalan dibatalkan"""
+        for _, _, future in pending:
+            future.cancel()
+        pending.clear()
+
+    # ------------------------------------------------------------------
+    # Format
+    # ------------------------------------------------------------------
+
+    def _process_zip(self, source: Target, output: Target, compression) -> BatchReport:
+        report = BatchReport()
+        pending: Deque = deque()
+
+        with zipfile.ZipFile(source) as zin, \
+                zipfile.ZipFile(output, 'w', compression) as zout:
+            infos = zin.infolist()
+
+            # Cek header dulu sebelum membaca apapun
+            declared = sum(info.file_size for info in infos)
+            compressed = sum(info.compress_size for info in infos)
+            if len(infos) > self.max_members:
+                raise ArchiveError(f"Arsip berisi lebih dari {self.max_members} file")
+            if declared > self.max_total_size:
+                raise ArchiveError(
+                    f"Total isi arsip melebihi {self.max_total_size // 1024 // 1024}MB"
+                )
+            if compressed and declared / compressed > self.max_ratio:
+                raise ArchiveError("Rasio kompresi arsip mencurigakan")
+            self._compressed = compressed
+
+            infos_by_name = {}
+
+            def write(name: str, data: bytes):
+                src_info = infos_by_name[name]
+                out_info = zipfile.ZipInfo(name, date_time=src_info.date_time)
+                # Mode file (mis. script executable) ikut disalin
+                out_info.external_attr = src_info.external_attr
+                zout.writestr(out_info, data, compress_type=compression)
+
+            try:
+                for info in infos:
+                    name = _safe_name(info.filename)
+                    if name is None:
+                        report.skipped.append((info.filename, "path tidak aman"))
+                        continue
+                    if not name:
+                        continue
+                    self._count_member(name)
+
+                    if info.flag_bits & 0x1:
+                        report.skipped.append((name, "terenkripsi"))
+                        continue
+                    if info.is_dir():
+                        zout.writestr(zipfile.ZipInfo(name + '/', date_time=info.date_time), b'')
+                        continue
+
+                    with zin.open(info) as src:
+                        if name.endswith('.py'):
+                            infos_by_name[name] = info
+                            self._submit(pending, name, self._read_member(name, src),
+                                         report, write)
+                        else:
+                            out_info = zipfile.ZipInfo(name, date_time=info.date_time)
+                            out_info.external_attr = info.external_attr
+                            out_info.compress_type = compression
+                            with zout.open(out_info, 'w') as dst:
+                                self._copy_member(name, src, dst)
+                            report.copied.append(name)
+
+                while pending:
+                    self._drain_one(pending, report, write)
+            except BaseException:
+                self._cancel_all(pending)
+                raise
+
+        return report
+
+    def _process_tar(self, source: Target, output: Target, mode: str) -> BatchReport:
+        report = BatchReport()
+        pending: Deque = deque()
+
+        # Tar tidak punya daftar isi di depan: rasio dicek terhadap ukuran
+        # arsip terkompresi selama member dibaca
+        self._compressed = _source_size(source)
+
+        # 'r|*' = mode stream: member dibaca berurutan, kompresi dideteksi otomatis
+        with _open_tar(source, 'r|*') as tin, _open_tar(output, mode) as tout:
+            infos = {}
+
+            def write(name: str, data: bytes):
+                out_info = infos[name]
+                out_info.size = len(data)
+                tout.addfile(out_info, io.BytesIO(data))
+
+            try:
+                for member in tin:
+                    # Mode stream tetap mendekompresi isi member yang dilewati
+                    # untuk sampai ke member berikutnya: ukuran header dihitung
+                    # sebelum apapun dibaca atau dilewati
+                    self._count_member(member.name)
+                    self._count_bytes(member.size)
+
+                    name = _safe_name(member.name)
+                    if name is None:
+                        report.skipped.append((member.name, "path tidak aman"))
+                        continue
+                    if not name:
+                        continue
+
+                    if member.isdir():
+                        tout.addfile(self._tar_info(member, name))
+                        continue
+                    if not member.isfile():
+                        # Symlink, device, dll tidak ikut disalin
+                        report.skipped.append((name, "bukan file biasa"))
+                        continue
+
+                    src = tin.extractfile(member)
+                    if name.endswith('.py'):
+                        # Ukuran member tar selalu sama dengan header (tidak dikompres per file)
+                        if member.size > self.max_member_size:
+                            raise ArchiveError(f"{name} terlalu besar setelah diekstrak")
+                        infos[name] = self._tar_info(member, name)
+                        self._submit(pending, name, src.read(), report, write)
+                    else:
+                        tout.addfile(self._tar_info(member, name), src)
+                        report.copied.append(name)
+
+                while pending:
+                    self._drain_one(pending, report, write)
+            except BaseException:
+                self._cancel_all(pending)
+                raise
+
+        return report
+
+    @staticmethod
+    def _tar_info(member: tarfile.TarInfo, name: str) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(name)
+        info.type = member.type
+        info.size = member.size if member.isfile() else 0
+        info.mode = member.mode
+        info.mtime = member.mtime
+        return info
+
+
+def _source_size(source: Target) -> int:
+    """Ukuran arsip input dalam byte, 0 kalau tidak bisa diketahui"""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    if not source.seekable():
+        return 0
+    position = source.tell()
+    size = source.seek(0, io.SEEK_END) - position
+    source.seek(position)
+    return size
+
+
+def _open_tar(target: Target, mode: str) -> tarfile.TarFile:
+    if isinstance(target, str):
+        return tarfile.open(target, mode)
+    return tarfile.open(fileobj=target, mode=mode)
+
+
+def completed_future(fn, *args) -> Future:
+    """Jalankan fn langsung dan bungkus hasil/exception-nya sebagai Future"""
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
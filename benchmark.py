@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+Benchmark untuk obfuscator_core
+Corpus digenerate (deterministik) dari kecil sampai MAX_FILE_SIZE,
+hasil disimpan sebagai JSON supaya bisa dibandingkan antar commit.
+
+Contoh:
+    python benchmark.py --sizes 10k,100k,1m --output bench/before.json
+    python benchmark.py --sizes 10k,100k,1m --compare bench/before.json
+    python benchmark.py --suites rename --rename-names 10000,100000
+"""
+
+import os
+import gc
+import ast
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import shutil
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from obfuscator_core import (
+    PythonObfuscator, FileObfuscator, AdvancedObfuscator, DefinitionCache, RenamePass,
+    StringEncodePass, StringTablePass, xor_bytes, __version__
+)
+
+MAX_FILE_SIZE = 10 * 1024 * 1024  # sama dengan Config.MAX_FILE_SIZE di bot
+
+SHAPES = ['names', 'strings', 'nested', 'mixed']
+SIZE_UNITS = {'k': 1024, 'm': 1024 * 1024}
+
+# ============================================================================
+# Corpus
+# ============================================================================
+
+def _chunk_names(rng: random.Random, index: int) -> str:
+    """Fungsi dengan banyak nama variabel unik"""
+    lines = [f"def compute_{index}(arg_a, arg_b):"]
+    names = [f"value_{index}_{i}" for i in range(rng.randint(20, 40))]
+    lines.append(f"    {names[0]} = arg_a + arg_b")
+    for prev, name in zip(names, names[1:]):
+        lines.append(f"    {name} = {prev} * {rng.randint(1, 9)} + arg_a")
+    lines.append(f"    return {names[-1]}")
+    return "\n".join(lines) + "\n\n"
+
+def _chunk_strings(rng: random.Random, index: int) -> str:
+    """Fungsi dengan banyak string literal"""
+    words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta']
+    lines = [f"def messages_{index}():", "    result = []"]
+    for i in range(rng.randint(15, 30)):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(2, 8)))
+        lines.append(f"    result.append('{text} {i}')")
+    lines.append(f"    result.append(f'total {{len(result)}} for {index}')")
+    lines.append("    return {'key_%d': result, 'name': 'messages'}" % index)
+    return "\n".join(lines) + "\n\n"
+
+def _chunk_nested(rng: random.Random, index: int) -> str:
+    """Fungsi dengan blok bersarang dan ekspresi dalam"""
+    depth = rng.randint(8, 16)
+    lines = [f"def nested_{index}(data):", "    total = 0"]
+    indent = "    "
+    for level in range(depth):
+        if level % 3 == 0:
+            lines.append(f"{indent}for item_{level} in range(2):")
+        elif level % 3 == 1:
+            lines.append(f"{indent}if data > {level}:")
+        else:
+            lines.append(f"{indent}while total < {level * 10}:")
+        indent += "    "
+        lines.append(f"{indent}total += {level}")
+    expr = "data"
+    for level in range(rng.randint(10, 30)):
+        expr = f"({expr} + {level})"
+    lines.append(f"{indent}total += {expr}")
+    lines.append("    return total")
+    return "\n".join(lines) + "\n\n"
+
+CHUNKS = {
+    'names': [_chunk_names],
+    'strings': [_chunk_strings],
+    'nested': [_chunk_nested],
+    'mixed': [_chunk_names, _chunk_strings, _chunk_nested],
+}
+
+def generate_corpus(shape: str, size: int, seed: int = 0) -> str:
+    """Generate script Python valid dengan ukuran mendekati `size` byte"""
+    rng = random.Random(f"{shape}-{size}-{seed}")
+    makers = CHUNKS[shape]
+    parts = [f'"""Generated benchmark corpus: {shape}, {size} bytes"""\n\n']
+    total = len(parts[0])
+    index = 0
+
+    while total < size:
+        chunk = makers[index % len(makers)](rng, index)
+        parts.append(chunk)
+        total += len(chunk)
+        index += 1
+
+    return "".join(parts)
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text == 'max':
+        return MAX_FILE_SIZE
+    if text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+# ============================================================================
+# Pengukuran
+# ============================================================================
+
+def measure(fn: Callable[[], object], repeat: int = 3, memory: bool = True) -> Dict:
+    """Ukur wall time (min/median dari `repeat`) dan peak memory (run terpisah)"""
+    times = []
+    result = None
+
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    times.sort()
+    return {
+        'time_min': times[0],
+        'time_median': times[len(times) // 2],
+        'peak_memory': peak,
+        'result': result
+    }
+
+def _output_size(result) -> int:
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    return 0
+
+# ============================================================================
+# Suites
+# ============================================================================
+
+def suite_obfuscate(corpus: Dict, args) -> List[Dict]:
+    """PythonObfuscator.obfuscate_code, FileObfuscator.obfuscate_file, advanced"""
+    results = []
+    code_obf = PythonObfuscator()
+    file_obf = FileObfuscator()
+    tmp_dir = tempfile.mkdtemp(prefix='obf_bench_')
+
+    # seed tetap: ukuran output (advanced) sama di setiap run
+    options = {'compression': args.compression, 'compression_level': args.compression_level,
+               'seed': args.seed}
+
+    for (shape, size), code in corpus.items():
+        input_size = len(code.encode('utf-8'))
+        input_path = os.path.join(tmp_dir, f"{shape}_{size}.py")
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write(code)
+
+        targets = []
+        for level in args.levels:
+            if level == 'advanced':
+                targets.append(('multi_layer_obfuscate', level,
+                                lambda: AdvancedObfuscator.multi_layer_obfuscate(
+                                    code, layers=3, **options)))
+                continue
+
+            level = int(level)
+            targets.append(('obfuscate_code', level,
+                            lambda level=level: code_obf.obfuscate_code(code, level, **options)))
+            if args.include_file:
+                output_path = os.path.join(tmp_dir, f"{shape}_{size}_l{level}.out.py")
+
+                def run_file(level=level, output_path=output_path):
+                    file_obf.obfuscate_file(input_path, output_path, level=level, **options)
+                    return os.path.getsize(output_path)
+
+                targets.append(('obfuscate_file', level, run_file))
+
+        for name, level, fn in targets:
+            m = measure(fn, repeat=args.repeat, memory=not args.no_memory)
+            result = m.pop('result')
+            output_size = result if isinstance(result, int) else _output_size(result)
+            row = {
+                'suite': 'obfuscate',
+                'target': name,
+                'level': level,
+                'shape': shape,
+                'size': size,
+                'input_bytes': input_size,
+                'output_bytes': output_size,
+                'size_ratio': output_size / input_size if input_size else None,
+                **m
+            }
+            results.append(row)
+            _print_row(row)
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+def _xor_legacy(text: str, key: str) -> bytes:
+    """Implementasi XOR lama (per karakter) sebagai pembanding"""
+    return bytes(ord(c) ^ ord(key[j % len(key)]) for j, c in enumerate(text))
+
+def suite_xor(corpus: Dict, args) -> List[Dict]:
+    """XOR per karakter (lama) vs xor_bytes, dengan cek output identik"""
+    results = []
+    key = 'password'
+
+    for (shape, size), code in corpus.items():
+        try:
+            data = code.encode('latin-1')
+        except UnicodeEncodeError:
+            continue
+
+        legacy = measure(lambda: _xor_legacy(code, key), repeat=args.repeat, memory=False)
+        bulk = measure(lambda: xor_bytes(data, key.encode()), repeat=args.repeat, memory=False)
+
+        if legacy['result'] != bulk['result']:
+            raise AssertionError(f"Output xor_bytes berbeda untuk corpus {shape}/{size}")
+
+        for name, m in (('xor_legacy', legacy), ('xor_bytes', bulk)):
+            m.pop('result')
+            row = {
+                'suite': 'xor',
+                'target': name,
+                'level': 'advanced',
+                'shape': shape,
+                'size': size,
+                'input_bytes': len(data),
+                'output_bytes': len(data),
+                'size_ratio': 1.0,
+                **m
+            }
+            results.append(row)
+            _print_row(row)
+
+        print(f"{'':<10} speedup xor_bytes: {legacy['time_median'] / bulk['time_median']:.1f}x")
+
+    return results
+
+RUNTIME_PROGRAM = """
+def lookup_words(n):
+    table = {'alpha': 1, 'beta': 2, 'gamma': 3, 'delta': 4}
+    total = 0
+    for i in range(n):
+        total += table['alpha'] + table['gamma']
+        label = 'item-' + 'x'
+        if label.startswith('item'):
+            total += len('delta')
+    return total
+
+def build_report(n):
+    lines = []
+    for i in range(n):
+        lines.append('%s: %s' % ('row', 'value'))
+    return '\\n'.join(lines)
+
+RESULT = lookup_words(ITERATIONS) + len(build_report(ITERATIONS // 10))
+"""
+
+def _string_pass_only(code: str, string_pass) -> str:
+    tree = string_pass.run(ast.parse(code))
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+def suite_runtime(corpus: Dict, args) -> List[Dict]:
+    """Overhead runtime program hasil obfuscation dibanding program asli"""
+    results = []
+    code = RUNTIME_PROGRAM.replace('ITERATIONS', str(args.runtime_iterations))
+    code_obf = PythonObfuscator()
+
+    variants = [
+        ('original', code),
+        ('strings-inline', _string_pass_only(code, StringEncodePass())),
+        ('strings-table', _string_pass_only(code, StringTablePass())),
+    ]
+    for level in args.levels:
+        if level != 'advanced':
+            variants.append((f"level-{level}", code_obf.obfuscate_code(code, int(level))))
+
+    baseline = None
+    for name, program in variants:
+        compiled = compile(program, '<runtime-bench>', 'exec')
+
+        def run(compiled=compiled):
+            namespace = {'__name__': '__bench__'}
+            exec(compiled, namespace)
+            return namespace.get('RESULT')
+
+        try:
+            m = measure(run, repeat=args.repeat, memory=False)
+        except Exception as e:
+            print(f"{'runtime':<10} {name:<22} error: {e!r}")
+            results.append({'suite': 'runtime', 'target': name, 'error': repr(e)})
+            continue
+
+        m.pop('result')
+        if baseline is None:
+            baseline = m['time_median']
+        row = {
+            'suite': 'runtime',
+            'target': name,
+            'level': name,
+            'shape': 'hotloop',
+            'size': args.runtime_iterations,
+            'input_bytes': len(code),
+            'output_bytes': len(program),
+            'size_ratio': len(program) / len(code),
+            'overhead': m['time_median'] / baseline,
+            **m
+        }
+        results.append(row)
+        _print_row(row)
+        print(f"{'':<10} overhead vs original: {row['overhead']:.2f}x")
+
+    return results
+
+def _rename_legacy(tree: ast.AST) -> ast.AST:
+    """RenamePass lama (dir(__builtins__) per node) sebagai pembanding"""
+    var_map = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in dir(__builtins__):
+            if node.id not in var_map:
+                var_map[node.id] = f"var_{len(var_map) + 1:04d}"
+            node.id = var_map[node.id]
+    return tree
+
+def generate_names_corpus(count: int) -> str:
+    """Kode dengan tepat count nama lokal unik, 50 per fungsi"""
+    lines = []
+    for index in range(0, count, 50):
+        names = [f"name_{index + i}" for i in range(min(50, count - index))]
+        lines.append(f"def scope_{index}(arg):")
+        lines.append(f"    {names[0]} = arg + len(str(arg))")
+        for prev, name in zip(names, names[1:]):
+            lines.append(f"    {name} = {prev} + 1")
+        lines.append(f"    return {names[-1]}")
+    return "\n".join(lines) + "\n"
+
+def suite_rename(corpus: Dict, args) -> List[Dict]:
+    """RenamePass lama vs baru pada N nama unik; waktu per nama harus tetap"""
+    results = []
+    per_name = {}
+
+    for count in args.rename_names:
+        code = generate_names_corpus(count)
+        targets = [('rename', lambda: RenamePass().run(ast.parse(code)))]
+        if count <= args.rename_legacy_max:
+            targets.append(('rename_legacy', lambda: _rename_legacy(ast.parse(code))))
+        parse = measure(lambda: ast.parse(code), repeat=args.repeat, memory=False)['time_median']
+
+        for name, fn in targets:
+            m = measure(fn, repeat=args.repeat, memory=not args.no_memory)
+            m.pop('result')
+            # Waktu parse dikurangkan supaya yang terukur hanya pass rename
+            pass_time = max(m['time_median'] - parse, 0.0)
+            row = {
+                'suite': 'rename',
+                'target': name,
+                'level': 1,
+                'shape': 'names',
+                'size': count,
+                'input_bytes': len(code),
+                'output_bytes': None,
+                'size_ratio': None,
+                'pass_time': pass_time,
+                'ns_per_name': pass_time / count * 1e9,
+                **m
+            }
+            results.append(row)
+            _print_row(row)
+            print(f"{'':<10} {name}: {row['ns_per_name']:.0f} ns/nama (tanpa parse)")
+            per_name.setdefault(name, []).append(row['ns_per_name'])
+
+    for name, values in per_name.items():
+        if len(values) > 1:
+            print(f"{'':<10} {name}: ns/nama terbesar/terkecil {max(values) / min(values):.2f}x "
+                  f"(~1x = linear)")
+
+    return results
+
+def suite_incremental(corpus: Dict, args) -> List[Dict]:
+    """Upload ulang dengan satu fungsi berubah: tanpa cache vs DefinitionCache hangat"""
+    results = []
+    # seed tetap: ukuran output (advanced) sama di setiap run
+    options = {'compression': args.compression, 'compression_level': args.compression_level,
+               'seed': args.seed}
+
+    for (shape, size), code in corpus.items():
+        input_size = len(code.encode('utf-8'))
+        for level in args.levels:
+            # DefinitionCache hanya dipakai di level 1-2
+            if level == 'advanced' or int(level) >= 3:
+                continue
+            level = int(level)
+
+            cache = DefinitionCache(max_entries=1000000)
+            cached_obf = PythonObfuscator(definition_cache=cache)
+            cached_obf.obfuscate_code(code, level, **options)
+            edits = iter(range(1, 1000000))
+
+            def edited() -> str:
+                # Tiap run mengubah satu fungsi dengan cara berbeda (selalu cache miss)
+                return code.replace("return ", f"return {next(edits)} and ", 1)
+
+            targets = [
+                ('full', lambda: PythonObfuscator().obfuscate_code(
+                    edited(), level, **options)),
+                ('definition_cache', lambda: cached_obf.obfuscate_code(
+                    edited(), level, **options)),
+            ]
+            times = {}
+            for name, fn in targets:
+                m = measure(fn, repeat=args.repeat, memory=not args.no_memory)
+                result = m.pop('result')
+                row = {
+                    'suite': 'incremental',
+                    'target': name,
+                    'level': level,
+                    'shape': shape,
+                    'size': size,
+                    'input_bytes': input_size,
+                    'output_bytes': _output_size(result),
+                    'size_ratio': _output_size(result) / input_size if input_size else None,
+                    **m
+                }
+                results.append(row)
+                _print_row(row)
+                times[name] = m['time_median']
+
+            print(f"{'':<10} speedup definition_cache: "
+                  f"{times['full'] / times['definition_cache']:.1f}x")
+
+    return results
+
+SUITES = {
+    'obfuscate': suite_obfuscate,
+    'xor': suite_xor,
+    'runtime': suite_runtime,
+    'rename': suite_rename,
+    'incremental': suite_incremental,
+}
+
+# ============================================================================
+# Output & perbandingan
+# ============================================================================
+
+def _print_row(row: Dict):
+    peak = row.get('peak_memory')
+    peak_text = f"{peak / 1024 / 1024:8.1f}MB" if peak is not None else "       -"
+    ratio = row.get('size_ratio')
+    ratio_text = f"{ratio:6.2f}x" if ratio is not None else "     -"
+    print(f"{row['suite']:<10} {row['target']:<22} {str(row['level']):<9} "
+          f"{row['shape']:<8} {row['size']:>10}  {row['time_median'] * 1000:10.1f}ms  "
+          f"{peak_text}  {ratio_text}")
+
+def _row_key(row: Dict) -> tuple:
+    return (row['suite'], row['target'], str(row['level']), row['shape'], row['size'])
+
+def compare(current: List[Dict], baseline_path: str):
+    """Cetak perubahan waktu/memori terhadap hasil JSON sebelumnya"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {_row_key(row): row for row in json.load(f)['results'] if 'error' not in row}
+
+    print(f"\nPerbandingan dengan {baseline_path}:")
+    for row in current:
+        if 'error' in row:
+            continue
+        old = baseline.get(_row_key(row))
+        if not old:
+            continue
+        speedup = old['time_median'] / row['time_median'] if row['time_median'] else float('inf')
+        memory_text = ""
+        if old.get('peak_memory') and row.get('peak_memory'):
+            memory_text = f"  memory {row['peak_memory'] / old['peak_memory']:.2f}x"
+        print(f"  {row['target']:<22} {str(row['level']):<9} {row['shape']:<8} "
+              f"{row['size']:>10}  speedup {speedup:6.2f}x{memory_text}")
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark obfuscator_core")
+    parser.add_argument('--suites', default='obfuscate',
+                        help=f"Suite dipisah koma ({', '.join(SUITES)})")
+    parser.add_argument('--shapes', default=','.join(SHAPES),
+                        help="Bentuk corpus dipisah koma (names, strings, nested, mixed)")
+    parser.add_argument('--sizes', default='10k,100k,1m',
+                        help="Ukuran corpus dipisah koma, mis. 10k,1m,max (max = 10MB)")
+    parser.add_argument('--levels', default='1,2,3,advanced',
+                        help="Level dipisah koma (1, 2, 3, advanced)")
+    parser.add_argument('--compression', default='zlib', help="zlib, lzma atau none")
+    parser.add_argument('--compression-level', type=int, default=9)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--runtime-iterations', type=int, default=200000,
+                        help="Jumlah iterasi program untuk suite runtime")
+    parser.add_argument('--rename-names', default='10000,100000',
+                        help="Jumlah nama unik untuk suite rename, dipisah koma")
+    parser.add_argument('--rename-legacy-max', type=int, default=10000,
+                        help="Batas jumlah nama untuk pembanding rename lama (lambat)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed corpus dan seed obfuscation (output deterministik)")
+    parser.add_argument('--include-file', action='store_true',
+                        help="Ukur juga FileObfuscator.obfuscate_file (termasuk I/O)")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Lewati pengukuran peak memory (tracemalloc)")
+    parser.add_argument('--output', help="Simpan hasil ke file JSON")
+    parser.add_argument('--compare', help="Bandingkan dengan file JSON sebelumnya")
+    args = parser.parse_args(argv)
+
+    args.rename_names = [int(n) for n in args.rename_names.split(',') if n.strip()]
+    args.levels = [level.strip() for level in args.levels.split(',') if level.strip()]
+    shapes = [shape.strip() for shape in args.shapes.split(',') if shape.strip()]
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+
+    corpus = {
+        (shape, size): generate_corpus(shape, size, args.seed)
+        for shape in shapes for size in sizes
+    }
+
+    print(f"{'suite':<10} {'target':<22} {'level':<9} {'shape':<8} {'size':>10}  "
+          f"{'median':>12}  {'peak mem':>10}  {'ratio':>7}")
+
+    results = []
+    for suite in args.suites.split(','):
+        results.extend(SUITES[suite.strip()](corpus, args))
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': _git_commit(),
+        'obfuscator_version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHasil disimpan ke {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -39,7 +39,7 @@ def main():
                 print(f"⚠️  Failed to install {pkg}")
     
     # Buat folder
-    folders = ["uploads", "outputs", "logs", "backups"]
+    folders = ["logs", "cache", "backups"]
     for folder in folders:
         os.makedirs(folder, exist_ok=True)
         print(f"📁 Created folder: {folder}")
@@ -0,0 +1,161 @@
+"""
+Scheduler job obfuscation: antrian terbatas, round-robin per user,
+lane prioritas untuk admin dan batas job yang berjalan bersamaan
+"""
+
+import asyncio
+import inspect
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Optional
+
+
+class QueueFullError(Exception):
+    """Antrian penuh, job ditolak"""
+
+    def __init__(self, queued: int, capacity: int, per_user: bool = False):
+        self.queued = queued
+        self.capacity = capacity
+        self.per_user = per_user
+        super().__init__(f"Antrian penuh ({queued}/{capacity})")
+
+
+class _Lane:
+    """Satu lane antrian, round-robin antar user"""
+
+    def __init__(self):
+        self.users: "OrderedDict[int, Deque[asyncio.Future]]" = OrderedDict()
+        self.size = 0
+
+    def push(self, user_id: int, waiter: asyncio.Future):
+        self.users.setdefault(user_id, deque()).append(waiter)
+        self.size += 1
+
+    def pop(self) -> Optional[asyncio.Future]:
+        """Ambil job dari user berikutnya, lalu user itu pindah ke belakang"""
+        if not self.users:
+            return None
+
+        user_id, waiters = next(iter(self.users.items()))
+        waiter = waiters.popleft()
+        self.size -= 1
+
+        if waiters:
+            self.users.move_to_end(user_id)
+        else:
+            del self.users[user_id]
+        return waiter
+
+    def remove(self, user_id: int, waiter: asyncio.Future) -> bool:
+        waiters = self.users.get(user_id)
+        if not waiters or waiter not in waiters:
+            return False
+
+        waiters.remove(waiter)
+        self.size -= 1
+        if not waiters:
+            del self.users[user_id]
+        return True
+
+    def count(self, user_id: int) -> int:
+        return len(self.users.get(user_id, ()))
+
+    def position(self, user_id: int) -> int:
+        """Perkiraan jumlah job di depan job terakhir user (round-robin)"""
+        own = self.count(user_id)
+        ahead = sum(min(len(waiters), own) for uid, waiters in self.users.items()
+                    if uid != user_id)
+        return ahead + own
+
+
+class FairScheduler:
+    """Batasi job bersamaan dan bagi slot secara adil antar user"""
+
+    def __init__(self, max_concurrent: int = 2, max_queued: int = 50,
+                 max_queued_per_user: int = 2):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+
+        self.running = 0
+        self._priority = _Lane()
+        self._normal = _Lane()
+
+    @property
+    def queued(self) -> int:
+        return self._priority.size + self._normal.size
+
+    def check_capacity(self, user_id: int):
+        """Tolak cepat (QueueFullError) kalau job baru pasti tidak dapat tempat"""
+        if self.running < self.max_concurrent and not self.queued:
+            return
+
+        if self.queued >= self.max_queued:
+            raise QueueFullError(self.queued, self.max_queued)
+
+        user_queued = self._priority.count(user_id) + self._normal.count(user_id)
+        if user_queued >= self.max_queued_per_user:
+            raise QueueFullError(user_queued, self.max_queued_per_user, per_user=True)
+
+    async def run(self, user_id: int, job: Callable[[], Awaitable],
+                  priority: bool = False,
+                  on_queued: Optional[Callable[[int], object]] = None):
+        """Jalankan job() saat dapat slot; on_queued(posisi) dipanggil jika harus antri"""
+        await self._acquire(user_id, priority, on_queued)
+        try:
+            return await job()
+        finally:
+            self._release()
+
+    async def _acquire(self, user_id: int, priority: bool,
+                       on_queued: Optional[Callable[[int], object]]):
+        if self.running < self.max_concurrent and not self.queued:
+            self.running += 1
+            return
+
+        self.check_capacity(user_id)
+
+        lane = self._priority if priority else self._normal
+        waiter = asyncio.get_running_loop().create_future()
+        lane.push(user_id, waiter)
+
+        try:
+            if on_queued:
+                position = lane.position(user_id)
+                if lane is self._normal:
+                    position += self._priority.size
+                result = on_queued(position)
+                if inspect.isawaitable(result):
+                    await result
+
+            await waiter
+        except BaseException:
+            # Dibatalkan (atau on_queued gagal) sebelum job jalan
+            if not lane.remove(user_id, waiter) and waiter.done() and not waiter.cancelled():
+                # Slot sudah diberikan, kembalikan
+                self._release()
+            raise
+
+    def _release(self):
+        self.running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Berikan slot kosong ke job berikutnya (prioritas dulu)"""
+        while self.running < self.max_concurrent:
+            waiter = self._priority.pop() or self._normal.pop()
+            if waiter is None:
+                return
+            if waiter.done():
+                continue
+
+            self.running += 1
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            'running': self.running,
+            'queued': self.queued,
+            'queued_priority': self._priority.size,
+            'max_concurrent': self.max_concurrent,
+            'max_queued': self.max_queued
+        }
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+CLI obfuscation satu direktori (untuk CI/build)
+Semua file .py di source diobfuscate paralel di semua core, hasilnya ditulis
+ke direktori output dengan struktur yang sama. File lain disalin apa adanya.
+Manifest (hash sha256, mtime, ukuran) membuat run berikutnya incremental.
+
+Contoh:
+    python obfuscator_cli.py src/ build/obf --level 2
+    python obfuscator_cli.py src/ build/obf --level advanced --jobs 8
+"""
+
+import os
+import sys
+import json
+import shutil
+import fnmatch
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from obfuscator_core import __version__
+import worker_pool
+
+MANIFEST_NAME = ".obfuscator-manifest.json"
+DEFINITION_CACHE_SUFFIX = ".obfuscator-definitions.db"
+DEFAULT_EXCLUDES = ['.git', '.hg', '.svn', '__pycache__', '*.pyc', '.venv', 'venv', '*.obfc',
+                    f"*{DEFINITION_CACHE_SUFFIX}*"]
+
+
+# ============================================================================
+# Worker
+# ============================================================================
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_file(src: str, dst: str, rel: str, old_hash: Optional[str],
+               level: int, advanced: bool, options: Dict) -> Tuple[str, str]:
+    """Proses satu file di worker; return (status, sha256 source)
+
+    status: 'obfuscated', 'copied' atau 'unchanged' (isi sama dengan manifest)
+    """
+    with open(src, 'rb') as f:
+        data = f.read()
+    file_hash = hashlib.sha256(data).hexdigest()
+
+    # mtime berubah tapi isi sama (checkout ulang, touch): tidak perlu diproses
+    if file_hash == old_hash and os.path.exists(dst):
+        return 'unchanged', file_hash
+
+    if not rel.endswith('.py'):
+        _write_atomic(dst, data)
+        shutil.copystat(src, dst)
+        return 'copied', file_hash
+
+    code = data.decode('utf-8')
+    result = worker_pool.obfuscate_source(code, rel, level, advanced, options)
+    _write_atomic(dst, result.encode('utf-8'))
+    return 'obfuscated', file_hash
+
+
+# ============================================================================
+# Manifest
+# ============================================================================
+
+def load_manifest(path: str, settings: Dict) -> Dict[str, Dict]:
+    """Entry file dari manifest; kosong kalau versi/opsi obfuscator berbeda"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get('settings') != settings:
+        return {}
+    return manifest.get('files', {})
+
+
+def save_manifest(path: str, settings: Dict, files: Dict[str, Dict]):
+    data = json.dumps({'settings': settings, 'files': files}, indent=1, sort_keys=True)
+    _write_atomic(path, data.encode('utf-8'))
+
+
+# ============================================================================
+# Direktori
+# ============================================================================
+
+def default_definition_cache(output: str) -> str:
+    """Path default cache definisi: di samping output, bukan di dalamnya
+
+    Cache berisi string asli dari source, jadi tidak boleh ikut dirilis
+    bersama direktori output
+    """
+    output = os.path.abspath(output)
+    return os.path.join(os.path.dirname(output),
+                        f".{os.path.basename(output)}{DEFINITION_CACHE_SUFFIX}")
+
+
+def _excluded(name: str, patterns: List[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def walk_sources(root: str, excludes: List[str]):
+    """Yield (path relatif dengan '/', os.stat_result) untuk semua file di root"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not _excluded(d, excludes))
+        for filename in sorted(filenames):
+            if _excluded(filename, excludes):
+                continue
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            yield rel, os.stat(path)
+
+
+def obfuscate_tree(source: str, output: str, level: int = 2, advanced: bool = False,
+                   options: Optional[Dict] = None, jobs: Optional[int] = None,
+                   excludes: Optional[List[str]] = None, force: bool = False,
+                   manifest_path: Optional[str] = None, verbose: bool = False,
+                   definition_cache_path: Optional[str] = None) -> Dict:
+    """Obfuscate source ke output secara paralel dan incremental, return statistik
+
+    definition_cache_path: cache per def/class, file yang berubah hanya
+    memproses ulang definisi yang berubah
+    """
+    options = options or {}
+    excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+    manifest_path = manifest_path or os.path.join(output, MANIFEST_NAME)
+
+    source = os.path.abspath(source)
+    output = os.path.abspath(output)
+    os.makedirs(output, exist_ok=True)
+    if output == source or output.startswith(source + os.sep):
+        # Output di dalam source tidak boleh ikut di-walk
+        excludes = excludes + [os.path.basename(output)]
+
+    settings = {
+        'version': __version__,
+        'level': 'advanced' if advanced else level,
+        'options': options
+    }
+    old_files = {} if force else load_manifest(manifest_path, settings)
+    new_files: Dict[str, Dict] = {}
+    stats = {'obfuscated': 0, 'copied': 0, 'unchanged': 0, 'removed': 0, 'failed': []}
+
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1,
+                             initializer=worker_pool._init_worker,
+                             initargs=(definition_cache_path,)) as executor:
+        futures = {}
+        for rel, st in walk_sources(source, excludes):
+            dst = os.path.join(output, *rel.split('/'))
+            old = old_files.get(rel)
+            entry = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+            # Cepat: stat sama dengan manifest, tidak perlu baca/hash file
+            if (old and old.get('mtime_ns') == st.st_mtime_ns and old.get('size') == st.st_size
+                    and os.path.exists(dst)):
+                new_files[rel] = old
+                stats['unchanged'] += 1
+                continue
+
+            future = executor.submit(
+                build_file, os.path.join(source, rel), dst, rel,
+                old['sha256'] if old else None, level, advanced, options
+            )
+            futures[future] = (rel, entry)
+
+        try:
+            for future in as_completed(futures):
+                rel, entry = futures[future]
+                try:
+                    status, file_hash = future.result()
+                except Exception as e:
+                    stats['failed'].append((rel, f"{type(e).__name__}: {e}"))
+                    print(f"GAGAL  {rel}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+
+                entry['sha256'] = file_hash
+                new_files[rel] = entry
+                stats[status] += 1
+                if verbose and status != 'unchanged':
+                    print(f"{status:<10} {rel}")
+        finally:
+            # Manifest tetap disimpan walau dihentikan di tengah jalan,
+            # file yang belum selesai akan diproses di run berikutnya
+            save_manifest(manifest_path, settings, new_files)
+
+    # File yang sudah dihapus dari source juga dihapus dari output
+    failed = {rel for rel, _ in stats['failed']}
+    for rel in set(old_files) - set(new_files) - failed:
+        try:
+            os.remove(os.path.join(output, *rel.split('/')))
+            stats['removed'] += 1
+        except OSError:
+            pass
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Obfuscate seluruh direktori secara paralel dan incremental"
+    )
+    parser.add_argument('source', help="Direktori source")
+    parser.add_argument('output', help="Direktori output (struktur sama dengan source)")
+    parser.add_argument('--level', default='2', help="1, 2, 3 atau advanced (default 2)")
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help="Jumlah proses worker (default: jumlah core)")
+    parser.add_argument('--compression', default='zlib', help="zlib, lzma atau none")
+    parser.add_argument('--compression-level', type=int, default=9)
+    parser.add_argument('--string-mode', default='table', help="table atau inline (level 2+)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Mode deterministik: output sama persis di setiap build")
+    parser.add_argument('--exclude', action='append', default=None,
+                        help=f"Pola nama file/direktori yang dilewati, bisa berulang "
+                             f"(default: {' '.join(DEFAULT_EXCLUDES)})")
+    parser.add_argument('--manifest', help=f"Path manifest (default: <output>/{MANIFEST_NAME})")
+    parser.add_argument('--force', action='store_true', help="Abaikan manifest, proses semua file")
+    parser.add_argument('--definition-cache',
+                        help="Path cache per def/class, sebaiknya di luar output karena "
+                             f"berisi string asli (default: .<output>{DEFINITION_CACHE_SUFFIX} "
+                             "di samping direktori output)")
+    parser.add_argument('--no-definition-cache', action='store_true',
+                        help="Jangan pakai cache per def/class (hanya dipakai di level 1-2)")
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        parser.error(f"{args.source} bukan direktori")
+
+    advanced = args.level == 'advanced'
+    if not advanced and args.level not in ('1', '2', '3'):
+        parser.error("--level harus 1, 2, 3 atau advanced")
+
+    options = {'compression': args.compression, 'compression_level': args.compression_level}
+    if not advanced:
+        options['string_mode'] = args.string_mode
+    if args.seed is not None:
+        options['seed'] = args.seed
+
+    definition_cache = None
+    if not args.no_definition_cache:
+        definition_cache = args.definition_cache or default_definition_cache(args.output)
+
+    stats = obfuscate_tree(
+        args.source, args.output,
+        level=2 if advanced else int(args.level),
+        advanced=advanced,
+        options=options,
+        jobs=args.jobs,
+        excludes=args.exclude,
+        force=args.force,
+        manifest_path=args.manifest,
+        verbose=args.verbose,
+        definition_cache_path=definition_cache
+    )
+
+    print(f"{stats['obfuscated']} diobfuscate, {stats['copied']} disalin, "
+          f"{stats['unchanged']} tidak berubah, {stats['removed']} dihapus, "
+          f"{len(stats['failed'])} gagal")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
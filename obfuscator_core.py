@@ -3,90 +3,877 @@ Core Obfuscator Module
 """
 
 import os
+import sys
+import builtins
 import base64
 import zlib
+import lzma
 import random
 import string
 import ast
 import marshal
+import types
 import hashlib
 import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import itertools
 
-class PythonObfuscator:
+# Naikkan setiap kali format output berubah (bagian dari key cache)
+__version__ = "1.7.1"
+
+# Metode kompresi payload: nama -> (modul untuk loader, fungsi compress)
+COMPRESSORS = {
+    'zlib': ('zlib', lambda data, level: zlib.compress(data, level)),
+    'lzma': ('lzma', lambda data, level: lzma.compress(data, preset=level)),
+    'none': (None, lambda data, level: data),
+}
+
+class ObfuscationError(Exception):
+    """Hasil obfuscation tidak valid (tidak diturunkan diam-diam ke level lebih rendah)"""
+
+def compress_payload(data: bytes, method: str = 'zlib', level: int = 9) -> bytes:
+    if method not in COMPRESSORS:
+        raise ValueError(f"Metode kompresi tidak dikenal: {method}")
+    return COMPRESSORS[method][1](data, level)
+
+def decompress_expr(method: str, arg: str) -> str:
+    """Ekspresi decompress untuk loader (tanpa kompresi = argumen apa adanya)"""
+    module = COMPRESSORS[method][0]
+    return f"{module}.decompress({arg})" if module else arg
+
+def loader_imports(method: str, *modules: str) -> str:
+    module = COMPRESSORS[method][0]
+    return ", ".join(modules + ((module,) if module else ()))
+
+def canonical_code(code: types.CodeType) -> types.CodeType:
+    """Code object dengan konstanta frozenset diganti tuple terurut
+
+    Sebelum Python 3.11, frozenset konstanta (hasil optimasi `x in {...}` /
+    `for x in {...}`) di-marshal dalam urutan hash, yang untuk str/bytes
+    berbeda di tiap proses (PYTHONHASHSEED). Tuple memberi hasil marshal yang
+    sama di mana saja.
+    """
+    consts = []
+    changed = False
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            new = canonical_code(const)
+        elif isinstance(const, frozenset):
+            new = tuple(sorted(const, key=repr))
+        else:
+            new = const
+        changed = changed or new is not const
+        consts.append(new)
+    return code.replace(co_consts=tuple(consts)) if changed else code
+
+def dump_code(code: types.CodeType, deterministic: bool = False) -> bytes:
+    """marshal.dumps, dengan deterministic=True hasilnya sama antar proses"""
+    # Mulai 3.11 marshal sudah mengurutkan isi frozenset sendiri
+    if deterministic and sys.version_info < (3, 11):
+        code = canonical_code(code)
+    return marshal.dumps(code)
+
+def xor_bytes(data: bytes, key: bytes) -> bytes:
+    """XOR seluruh buffer dengan key berulang, sekaligus lewat int besar"""
+    if not data:
+        return b''
+    
+    repeats, remainder = divmod(len(data), len(key))
+    key_stream = key * repeats + key[:remainder]
+    
+    mixed = int.from_bytes(data, 'little') ^ int.from_bytes(key_stream, 'little')
+    return mixed.to_bytes(len(data), 'little')
+
+# Dihitung sekali, bukan dir(__builtins__) per node
+BUILTIN_NAMES = frozenset(dir(builtins))
+
+# Fungsi yang membaca namespace lokal lewat string, scope yang memakainya tidak di-rename
+_DYNAMIC_SCOPE_NAMES = frozenset({'locals', 'vars', 'eval', 'exec', 'dir'})
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+def _short_names(taken):
+    """Nama pendek _0, _1, ..., _z, _10, ... yang tidak bentrok dengan taken"""
+    digits = string.digits + string.ascii_lowercase
+    for n in itertools.count():
+        text = ''
+        while True:
+            n, rem = divmod(n, len(digits))
+            text = digits[rem] + text
+            if not n:
+                break
+        name = '_' + text
+        if name not in taken and name not in BUILTIN_NAMES:
+            yield name
+
+def _outer_parts(node: ast.AST) -> List[ast.AST]:
+    """Bagian scope bersarang yang dievaluasi di scope luarnya
+    (decorator, default argumen, anotasi, base class)"""
+    parts = list(getattr(node, 'decorator_list', ()))
+    if isinstance(node, ast.ClassDef):
+        return parts + node.bases + node.keywords
+
+    args = node.args
+    parts += args.defaults + [d for d in args.kw_defaults if d is not None]
+    if not isinstance(node, ast.Lambda):
+        for arg in _all_args(args):
+            if arg.annotation is not None:
+                parts.append(arg.annotation)
+        if node.returns is not None:
+            parts.append(node.returns)
+    return parts
+
+def _all_args(args: ast.arguments) -> List[ast.arg]:
+    result = args.posonlyargs + args.args + args.kwonlyargs
+    if args.vararg:
+        result.append(args.vararg)
+    if args.kwarg:
+        result.append(args.kwarg)
+    return result
+
+class _Scope:
+    """Nama-nama dalam satu scope (module, class, fungsi atau lambda)"""
+
+    __slots__ = ('node', 'renamable', 'bound', 'fixed', 'names', 'dynamic', 'binders')
+
+    def __init__(self, node: ast.AST, renamable: bool):
+        self.node = node
+        self.renamable = renamable
+        self.bound: Dict[str, None] = {}  # dict supaya urutan kemunculan tetap
+        self.fixed = set()                # nama yang tidak boleh diganti
+        self.names = set()                # semua nama, termasuk di scope bersarang
+        self.dynamic = False
+        self.binders: List[ast.AST] = []  # node Name/except/match milik scope ini
+
+class _ScopeCollector(ast.NodeVisitor):
+    """Satu traversal AST untuk mengumpulkan binding per scope"""
+
+    def __init__(self):
+        self.scopes: List[_Scope] = []
+        self.scope: _Scope = None
+
+    def collect(self, tree: ast.AST) -> List[_Scope]:
+        self._enter(tree, False, tree.body if hasattr(tree, 'body') else [])
+        return self.scopes
+
+    def _enter(self, node: ast.AST, renamable: bool, body, params=()):
+        outer = self.scope
+        scope = self.scope = _Scope(node, renamable)
+        self.scopes.append(scope)
+
+        scope.fixed.update(params)
+        scope.names.update(params)
+        for child in (body if isinstance(body, list) else [body]):
+            self.visit(child)
+
+        self.scope = outer
+        if outer is not None:
+            # Nama yang dipakai scope bersarang bisa jadi free variable, jangan diganti
+            outer.fixed |= scope.names
+            outer.names |= scope.names
+
+    def _bind(self, name: str, fixed: bool = False):
+        self.scope.names.add(name)
+        if fixed:
+            self.scope.fixed.add(name)
+        else:
+            self.scope.bound[name] = None
+
+    def _visit_function(self, node):
+        for part in _outer_parts(node):
+            self.visit(part)
+        self._bind(node.name, fixed=True)
+        params = [arg.arg for arg in _all_args(node.args)]
+        self._enter(node, True, node.body, params)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = _visit_function
+
+    def visit_Lambda(self, node: ast.Lambda):
+        for part in _outer_parts(node):
+            self.visit(part)
+        self._enter(node, False, node.body, [arg.arg for arg in _all_args(node.args)])
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        for part in _outer_parts(node):
+            self.visit(part)
+        self._bind(node.name, fixed=True)
+        self._enter(node, False, node.body)
+
+    def _visit_comprehension(self, node):
+        # Variabel loop comprehension hanya hidup di dalam comprehension; kalau
+        # nama yang sama juga di-bind di fungsi, di-rename bersama secara konsisten
+        for generator in node.generators:
+            self.visit(generator.iter)
+            for target in ast.walk(generator.target):
+                if not isinstance(target, ast.Name):
+                    continue
+                if isinstance(target.ctx, ast.Load):
+                    self.visit_Name(target)
+                    continue
+                self.scope.binders.append(target)
+                self.scope.names.add(target.id)
+                if target.id not in self.scope.bound:
+                    self.scope.fixed.add(target.id)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for field in ('elt', 'key', 'value'):
+            child = getattr(node, field, None)
+            if child is not None:
+                self.visit(child)
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+    def visit_Name(self, node: ast.Name):
+        self.scope.binders.append(node)
+        self.scope.names.add(node.id)
+        if isinstance(node.ctx, ast.Load):
+            if node.id in _DYNAMIC_SCOPE_NAMES:
+                self.scope.dynamic = True
+        else:
+            self._bind(node.id)
+
+    def visit_Global(self, node):
+        for name in node.names:
+            self._bind(name, fixed=True)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._bind(alias.asname or alias.name.split('.')[0], fixed=True)
+
+    visit_ImportFrom = visit_Import
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.name:
+            self.scope.binders.append(node)
+            self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node):
+        if node.name:
+            self.scope.binders.append(node)
+            self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node):
+        if node.name:
+            self.scope.binders.append(node)
+            self._bind(node.name)
+
+    def visit_MatchMapping(self, node):
+        if node.rest:
+            self.scope.binders.append(node)
+            self._bind(node.rest)
+        self.generic_visit(node)
+
+class RenamePass:
+    """Rename variabel lokal fungsi ke nama pendek (_0, _1, ...)
+
+    Scope di-resolve dalam satu traversal yang sekaligus mencatat node
+    nama per scope, jadi penggantian tidak perlu traversal kedua. Yang diganti hanya nama yang
+    di-bind di fungsi itu sendiri; parameter, global/nonlocal, import, nama
+    yang dipakai scope bersarang, serta scope module dan class tidak disentuh.
+    Penomoran mulai ulang di setiap fungsi, jadi hasil satu fungsi tidak
+    bergantung pada isi file lainnya."""
+
+    def run(self, tree: ast.AST) -> ast.AST:
+        for scope in _ScopeCollector().collect(tree):
+            if not scope.renamable or scope.dynamic:
+                continue
+
+            targets = [name for name in scope.bound if name not in scope.fixed]
+            if not targets:
+                continue
+
+            mapping = dict(zip(targets, _short_names(scope.names)))
+            for node in scope.binders:
+                if isinstance(node, ast.Name):
+                    node.id = mapping.get(node.id, node.id)
+                elif isinstance(node, ast.MatchMapping):
+                    node.rest = mapping.get(node.rest, node.rest)
+                else:
+                    node.name = mapping.get(node.name, node.name)
+
+        return tree
+
+class StringEncodePass(ast.NodeTransformer):
+    """Ganti string literal dengan base64 decode inline
+
+    Docstring module dan import __future__ di awal file tidak diubah: keduanya
+    harus tetap berupa statement pertama supaya hasilnya valid
+    """
+
+    def run(self, tree: ast.AST) -> ast.AST:
+        if not isinstance(tree, ast.Module):
+            return self.visit(tree)
+        prefix = _module_prefix(tree.body)
+        tree.body[prefix:] = [self.visit(stmt) for stmt in tree.body[prefix:]]
+        return tree
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if not isinstance(node.value, str):
+            return node
+
+        encoded = base64.b64encode(node.value.encode()).decode()
+        # __import__('base64').b64decode('...').decode()
+        b64decode = ast.Attribute(
+            value=ast.Call(
+                func=ast.Name(id='__import__', ctx=ast.Load()),
+                args=[ast.Constant(value='base64')],
+                keywords=[]
+            ),
+            attr='b64decode',
+            ctx=ast.Load()
+        )
+        replacement = ast.Call(
+            func=ast.Attribute(
+                value=ast.Call(func=b64decode, args=[ast.Constant(value=encoded)], keywords=[]),
+                attr='decode',
+                ctx=ast.Load()
+            ),
+            args=[],
+            keywords=[]
+        )
+        return ast.copy_location(replacement, node)
+
+    def visit_JoinedStr(self, node: ast.JoinedStr) -> ast.AST:
+        # Bagian literal f-string harus tetap Constant
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                value.value = self.visit(value.value)
+        return node
+
+    def visit_MatchValue(self, node: ast.MatchValue) -> ast.AST:
+        # Pola match harus berupa literal
+        return node
+
+    def visit_MatchMapping(self, node: ast.MatchMapping) -> ast.AST:
+        # Key pola mapping juga harus literal, cukup proses sub-polanya
+        node.patterns = [self.visit(pattern) for pattern in node.patterns]
+        return node
+
+class StringTablePass(StringEncodePass):
+    """Kumpulkan semua string literal (tanpa duplikat) ke satu tabel yang
+    di-decode sekali saat module di-import; tiap literal jadi _obf_str[i]"""
+
+    TABLE_NAME = '_obf_str'
+
+    def __init__(self, table_name: str = TABLE_NAME, insert_table: bool = True):
+        self.table_name = table_name
+        # False: tabel tidak disisipkan, pemanggil yang menggabungkan beberapa tabel
+        self.insert_table = insert_table
+        self.strings: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def run(self, tree: ast.Module) -> ast.Module:
+        tree = super().run(tree)
+
+        if self.strings and self.insert_table:
+            tree.body.insert(_module_prefix(tree.body),
+                             table_prologue([(self.table_name, self.strings)]))
+        return tree
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if not isinstance(node.value, str):
+            return node
+
+        index = self.index.get(node.value)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(node.value)
+            self.index[node.value] = index
+
+        lookup = ast.Subscript(
+            value=ast.Name(id=self.table_name, ctx=ast.Load()),
+            slice=ast.Constant(value=index),
+            ctx=ast.Load()
+        )
+        return ast.copy_location(lookup, node)
+
+def table_prologue(tables: List[Tuple[str, List[str]]]) -> ast.stmt:
+    """Satu statement yang men-decode semua tabel string sekaligus"""
+    # _obf_str = json.loads(zlib.decompress(base64.b64decode('...')))
+    # atau untuk beberapa tabel: _obf_str, _obf_s... = json.loads(...)
+    if len(tables) == 1:
+        target, data = tables[0][0], tables[0][1]
+    else:
+        target, data = ", ".join(name for name, _ in tables), [strings for _, strings in tables]
+    blob = base64.b64encode(zlib.compress(json.dumps(data).encode(), 9)).decode()
+    source = (
+        f"{target} = __import__('json').loads(__import__('zlib').decompress("
+        f"__import__('base64').b64decode('{blob}')))"
+    )
+    return ast.parse(source).body[0]
+
+def _module_prefix(body: List[ast.stmt]) -> int:
+    """Jumlah statement docstring + __future__ di awal body, yang harus tetap di
+    depan dan tidak diubah (kode tambahan disisipkan setelahnya)"""
+    count = 1 if body and _is_docstring(body[0]) else 0
+    while (count < len(body) and isinstance(body[count], ast.ImportFrom)
+           and body[count].module == '__future__'):
+        count += 1
+    return count
+
+def _is_docstring(node: ast.stmt) -> bool:
+    return (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str))
+
+class RiskScanner:
+    """Cari konstruksi berisiko dalam satu traversal AST
+    
+    Berbeda dengan pencarian teks, komentar dan isi string tidak ikut
+    terhitung, dan alias import (import os as o; o.system()) tetap dikenali.
+    Finding: {'kind': 'call' | 'import', 'name': ..., 'line': ..., 'col': ...}
+    """
+    
+    # Builtin yang dipanggil langsung (atau lewat builtins.X)
+    RISKY_CALLS = frozenset({'eval', 'exec', 'compile', 'open', '__import__'})
+    # Modul yang import dan semua pemanggilannya dicatat
+    RISKY_MODULES = frozenset({'subprocess'})
+    # Fungsi modul (nama penuh)
+    RISKY_FUNCTIONS = frozenset({'os.system'})
+    
     def __init__(self):
+        self.findings: List[Dict] = []
+        # Nama lokal hasil import -> nama penuh
+        self._aliases: Dict[str, str] = {}
+        # Setiap finding butuh salah satu kata ini muncul apa adanya di source
+        self._trigger_words = (self.RISKY_CALLS | self.RISKY_MODULES
+                               | {name.rsplit('.', 1)[-1] for name in self.RISKY_FUNCTIONS})
+    
+    def scan(self, tree: ast.AST, source: Optional[str] = None) -> List[Dict]:
+        """source (opsional): lewati traversal kalau tidak ada kata pemicu sama sekali"""
+        self.findings = []
+        self._aliases = {}
+        if source is not None and not any(word in source for word in self._trigger_words):
+            return self.findings
+        
+        # Traversal iteratif (lebih cepat dari NodeVisitor); call di-resolve
+        # setelah semua import terkumpul, jadi urutan di file tidak berpengaruh
+        calls = []
+        todo = [tree]
+        while todo:
+            node = todo.pop()
+            kind = type(node)
+            if kind is ast.Call:
+                calls.append(node)
+            elif kind is ast.Import:
+                self._visit_import(node)
+            elif kind is ast.ImportFrom:
+                self._visit_import_from(node)
+            
+            for field in getattr(kind, '_fields', ()):
+                value = getattr(node, field, None)
+                if type(value) is list:
+                    # Bisa berisi str/None (Global.names, Dict.keys), dilewati saat di-pop
+                    todo.extend(value)
+                elif isinstance(value, ast.AST):
+                    todo.append(value)
+        
+        for node in calls:
+            self._visit_call(node)
+        
+        self.findings.sort(key=lambda finding: (finding['line'], finding['col']))
+        return self.findings
+    
+    def _add(self, kind: str, name: str, node: ast.AST):
+        self.findings.append({
+            'kind': kind, 'name': name, 'line': node.lineno, 'col': node.col_offset
+        })
+    
+    def _risky_module(self, name: str) -> bool:
+        return name.split('.')[0] in self.RISKY_MODULES
+    
+    def _visit_import(self, node: ast.Import):
+        for alias in node.names:
+            if alias.asname:
+                self._aliases[alias.asname] = alias.name
+            else:
+                top = alias.name.split('.')[0]
+                self._aliases[top] = top
+            if self._risky_module(alias.name):
+                self._add('import', alias.name, node)
+    
+    def _visit_import_from(self, node: ast.ImportFrom):
+        if node.level or not node.module:
+            # Import relatif = modul milik project sendiri
+            return
+        if self._risky_module(node.module):
+            self._add('import', node.module, node)
+        for alias in node.names:
+            full = f"{node.module}.{alias.name}"
+            self._aliases[alias.asname or alias.name] = full
+            if full in self.RISKY_FUNCTIONS:
+                self._add('import', full, node)
+    
+    def _qualified_name(self, node: ast.AST) -> Optional[str]:
+        """Nama penuh untuk Name/Attribute berantai, alias import di-resolve"""
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(self._aliases.get(node.id, node.id))
+        return '.'.join(reversed(parts))
+    
+    def _visit_call(self, node: ast.Call):
+        name = self._qualified_name(node.func)
+        if not name:
+            return
+        if name.startswith('builtins.'):
+            name = name[len('builtins.'):]
+        if (name in self.RISKY_CALLS or name in self.RISKY_FUNCTIONS
+                or ('.' in name and self._risky_module(name))):
+            self._add('call', name, node)
+
+def scan_risks(tree: ast.AST, source: Optional[str] = None) -> List[Dict]:
+    """Finding RiskScanner untuk tree yang sudah di-parse (source untuk pre-filter cepat)"""
+    return RiskScanner().scan(tree, source)
+
+class DefinitionCache:
+    """Cache hasil obfuscation per definisi top-level (def/class)
+
+    Key = hash AST definisi yang dinormalisasi (tanpa posisi, komentar dan
+    format) + versi + level + opsi. Value = source hasil dan isi tabel
+    string milik definisi itu. Disimpan di memori (LRU); kalau path
+    diberikan, juga di SQLite supaya bisa dipakai bersama antar worker.
+    Aman dipakai dari beberapa thread (bot tanpa worker pool).
+
+    Isi cache memuat string asli user: dengan max_age (detik) entry yang
+    lebih tua tidak dipakai lagi dan dihapus oleh expire()/pemangkasan.
+    """
+
+    # Pangkas isi SQLite setiap sekian kali put
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, max_entries: int = 5000, path: Optional[str] = None,
+                 max_age: Optional[float] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        # key -> (created_at, (source, strings))
+        self._memory: "OrderedDict[str, Tuple[float, Tuple[str, List[str]]]]" = OrderedDict()
+        self._db = None
+        self._db_pid = None
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(node: ast.stmt, *options, lines: Optional[List[str]] = None) -> str:
+        """Hash definisi; dengan lines (source per baris) cukup hash teks aslinya,
+        tanpa lines pakai ast.dump (lebih lambat, tapi tidak peka format/komentar)"""
+        if lines is not None:
+            # Definisi top-level selalu menempati baris utuh, termasuk decorator
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            normalized = "\n".join(lines[start - 1:node.end_lineno])
+        else:
+            normalized = ast.dump(node)
+        salt = "|".join(str(option) for option in (__version__, sys.version_info[:2]) + options)
+        return hashlib.sha256(f"{salt}|{normalized}".encode()).hexdigest()
+
+    def _connection(self):
+        # Koneksi dibuat per proses (worker hasil fork tidak boleh memakai koneksi induk)
+        if self.path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS definitions ("
+                "key TEXT PRIMARY KEY, source TEXT NOT NULL, strings TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_definitions_created ON definitions (created_at)"
+            )
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        cutoff = self._cutoff()
+        cached = self._memory.get(key)
+        if cached is not None and cached[0] >= cutoff:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        db = self._connection()
+        if db is not None:
+            try:
+                row = db.execute(
+                    "SELECT source, strings, created_at FROM definitions "
+                    "WHERE key = ? AND created_at >= ?",
+                    (key, cutoff)
+                ).fetchone()
+                if row:
+                    db.execute("UPDATE definitions SET last_access = ? WHERE key = ?",
+                               (time.time(), key))
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry, row[2])
+                    self.hits += 1
+                    return entry
+            except sqlite3.Error:
+                pass
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, source: str, strings: List[str]):
+        with self._lock:
+            self._put(key, source, strings)
+
+    def _put(self, key: str, source: str, strings: List[str]):
+        now = time.time()
+        self._remember(key, (source, strings), now)
+
+        db = self._connection()
+        if db is None:
+            return
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO definitions VALUES (?, ?, ?, ?, ?)",
+                (key, source, json.dumps(strings), now, now)
+            )
+            self._puts += 1
+            if self._puts % self.PRUNE_INTERVAL == 0:
+                db.execute("DELETE FROM definitions WHERE created_at < ?", (self._cutoff(),))
+                db.execute(
+                    "DELETE FROM definitions WHERE key IN (SELECT key FROM definitions "
+                    "ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error:
+            # Gagal cache tidak boleh menggagalkan obfuscation
+            pass
+
+    def _remember(self, key: str, entry: Tuple[str, List[str]], created_at: float):
+        self._memory[key] = (created_at, entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _cutoff(self) -> float:
+        """created_at paling lama yang masih berlaku"""
+        return time.time() - self.max_age if self.max_age else 0.0
+
+    def expire(self) -> int:
+        """Hapus entry yang lebih tua dari max_age (memori dan SQLite),
+        return jumlah baris SQLite yang dihapus"""
+        if not self.max_age:
+            return 0
+
+        with self._lock:
+            cutoff = self._cutoff()
+            for key in [key for key, (created_at, _) in self._memory.items()
+                        if created_at < cutoff]:
+                del self._memory[key]
+
+            db = self._connection()
+            if db is None:
+                return 0
+            try:
+                return db.execute(
+                    "DELETE FROM definitions WHERE created_at < ?", (cutoff,)
+                ).rowcount
+            except sqlite3.Error:
+                return 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = len(self._memory)
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+_DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+class PythonObfuscator:
+    def __init__(self, definition_cache: Optional[DefinitionCache] = None):
         self.obfuscation_level = 3
+        self.compression = 'zlib'
+        self.compression_level = 9
+        self.string_mode = 'table'
+        self.seed = None
+        # Kalau diisi, def/class top-level yang tidak berubah diambil dari cache
+        self.definition_cache = definition_cache
+        
+    def obfuscate_code(self, code: str, level: int = 3, compression: str = 'zlib',
+                       compression_level: int = 9, string_mode: str = 'table',
+                       seed: Optional[int] = None, tree: Optional[ast.Module] = None) -> str:
+        """seed diisi = mode deterministik: input, level dan seed yang sama
+        selalu menghasilkan byte yang sama (juga di proses/mesin lain)
         
-    def obfuscate_code(self, code: str, level: int = 3) -> str:
+        tree: hasil ast.parse(code) yang sudah ada (mis. dipakai RiskScanner),
+        supaya source tidak di-parse ulang. Tree ini akan diubah.
+        """
         self.obfuscation_level = level
+        self.compression = compression
+        self.compression_level = compression_level
+        self.string_mode = string_mode
+        self.seed = seed
         
-        if level >= 1:
-            code = self._rename_variables(code)
+        if tree is None:
+            try:
+                tree = ast.parse(code)
+            except SyntaxError:
+                return code
         
-        if level >= 2:
-            code = self._encode_strings(code)
+        return self.obfuscate_tree(tree, level, source=code)
+    
+    def obfuscate_tree(self, tree: ast.Module, level: int = 3,
+                       source: Optional[str] = None) -> str:
+        """Jalankan semua pass di satu tree, tanpa parse ulang
+        
+        source (opsional) mempercepat hashing definisi untuk cache per definisi
+        """
+        # Cache per definisi hanya untuk level 1-2: level 3 butuh satu AST utuh
+        # untuk di-compile, dan menyusunnya dari source per definisi berarti
+        # unparse + parse ulang seluruh file (lebih lambat dari tanpa cache)
+        if self.definition_cache is not None and 1 <= level < 3:
+            return self._obfuscate_incremental(tree, level, source)
+        
+        for obf_pass in self._build_passes(level):
+            tree = obf_pass.run(tree)
+        
+        ast.fix_missing_locations(tree)
         
         if level >= 3:
-            code = self._compile_to_bytecode(code)
+            return self._compile_to_bytecode(tree)
         
-        return code
+        return ast.unparse(tree)
     
-    def _rename_variables(self, code: str) -> str:
-        try:
-            tree = ast.parse(code)
-            var_map = {}
-            counter = 1
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Name) and node.id not in dir(__builtins__):
-                    if node.id not in var_map:
-                        new_name = f"var_{counter:04d}"
-                        var_map[node.id] = new_name
-                        counter += 1
-                    node.id = var_map[node.id]
-            
-            return ast.unparse(tree)
-        except:
-            return code
+    def _build_passes(self, level: int, table_name: Optional[str] = None) -> List:
+        """table_name diisi: tabel string tidak disisipkan (digabung oleh pemanggil)"""
+        passes = []
+        
+        if level >= 1:
+            passes.append(RenamePass())
+        
+        if level >= 2:
+            # 'table': decode sekali saat import, 'inline': decode di setiap pemakaian
+            if self.string_mode == 'inline':
+                passes.append(StringEncodePass())
+            elif table_name:
+                passes.append(StringTablePass(table_name, insert_table=False))
+            else:
+                passes.append(StringTablePass())
+        
+        return passes
     
-    def _encode_strings(self, code: str) -> str:
-        try:
-            tree = ast.parse(code)
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Constant) and isinstance(node.value, str):
-                    encoded = base64.b64encode(node.value.encode()).decode()
-                    replacement = f"__import__('base64').b64decode('{encoded}').decode()"
-                    
-                    new_node = ast.parse(replacement, mode='eval').body
-                    node.value = None
-                    node = new_node
+    def _obfuscate_incremental(self, tree: ast.Module, level: int,
+                               source: Optional[str] = None) -> str:
+        """Obfuscate per definisi top-level, definisi yang tidak berubah dari cache
+        
+        Rename sudah deterministik per fungsi; string tiap definisi masuk ke
+        tabelnya sendiri (_obf_s<hash>) supaya hasilnya tidak bergantung pada
+        isi file lainnya. Semua tabel di-decode dalam satu statement.
+        """
+        body = tree.body
+        # Docstring + __future__ tetap di depan, tidak ikut diobfuscate
+        prefix_count = _module_prefix(body)
+        lines = None
+        if source is not None:
+            # Pemisah baris sama dengan tokenizer Python (bukan str.splitlines)
+            lines = source.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        
+        segments: List = []
+        tables: Dict[str, List[str]] = {}
+        rest = ast.Module(body=[], type_ignores=[])
+        
+        for stmt in body[prefix_count:]:
+            if isinstance(stmt, _DEFINITION_NODES):
+                segments.append(self._definition_segment(stmt, level, tables, lines))
+            else:
+                segments.append(stmt)
+                rest.body.append(stmt)
+        
+        # Statement module lainnya diproses sekali bersama (node diubah di tempat)
+        rest_table = None
+        for obf_pass in self._build_passes(level, StringTablePass.TABLE_NAME):
+            obf_pass.run(rest)
+            if isinstance(obf_pass, StringTablePass) and obf_pass.strings:
+                rest_table = obf_pass.strings
+        
+        all_tables = list(tables.items())
+        if rest_table:
+            all_tables.insert(0, (StringTablePass.TABLE_NAME, rest_table))
+        
+        header = body[:prefix_count]
+        if all_tables:
+            header.append(table_prologue(all_tables))
+        
+        parts = [ast.unparse(ast.fix_missing_locations(stmt)) for stmt in header]
+        parts += [segment if isinstance(segment, str)
+                  else ast.unparse(ast.fix_missing_locations(segment))
+                  for segment in segments]
+        return "\n".join(parts)
+    
+    def _definition_segment(self, stmt: ast.stmt, level: int, tables: Dict[str, List[str]],
+                            lines: Optional[List[str]] = None) -> str:
+        key = DefinitionCache.make_key(stmt, level, self.string_mode, lines=lines)
+        table_name = f"_obf_s{key[:12]}"
+        
+        cached = self.definition_cache.get(key)
+        if cached is None:
+            module = ast.Module(body=[stmt], type_ignores=[])
+            strings: List[str] = []
+            for obf_pass in self._build_passes(level, table_name):
+                module = obf_pass.run(module)
+                if isinstance(obf_pass, StringTablePass):
+                    strings = obf_pass.strings
             
-            return ast.unparse(tree)
-        except:
-            return code
+            cached = (ast.unparse(ast.fix_missing_locations(module)), strings)
+            self.definition_cache.put(key, *cached)
+        
+        source, strings = cached
+        if strings:
+            tables[table_name] = strings
+        return source
     
-    def _compile_to_bytecode(self, code: str) -> str:
+    def _compile_to_bytecode(self, tree: ast.Module) -> str:
         try:
-            compiled = compile(code, '<string>', 'exec')
-            marshaled = marshal.dumps(compiled)
-            encoded = base64.b64encode(marshaled).decode()
-            
-            loader = f"""
-import marshal, base64
-exec(marshal.loads(base64.b64decode('{encoded}')))
+            compiled = compile(tree, '<string>', 'exec')
+        except (SyntaxError, ValueError) as e:
+            raise ObfuscationError(f"Hasil obfuscation level 3 gagal di-compile: {e}") from e
+        
+        marshaled = compress_payload(
+            dump_code(compiled, deterministic=self.seed is not None),
+            self.compression, self.compression_level
+        )
+        encoded = base64.b64encode(marshaled).decode()
+        payload = decompress_expr(self.compression, f"base64.b64decode('{encoded}')")
+        
+        loader = f"""
+import {loader_imports(self.compression, 'marshal', 'base64')}
+exec(marshal.loads({payload}))
 """
-            return loader.strip()
-        except:
-            return code
+        return loader.strip()
 
 class FileObfuscator:
-    def __init__(self):
-        self.code_obf = PythonObfuscator()
+    def __init__(self, definition_cache: Optional[DefinitionCache] = None):
+        self.code_obf = PythonObfuscator(definition_cache)
     
-    def obfuscate_file(self, input_file: str, output_file: str = None, level: int = 2) -> str:
+    def obfuscate_file(self, input_file: str, output_file: str = None, level: int = 2,
+                       **options) -> str:
         if not output_file:
             base_name = os.path.basename(input_file)
             name, ext = os.path.splitext(base_name)
@@ -95,34 +882,85 @@ class FileObfuscator:
         with open(input_file, 'r', encoding='utf-8') as f:
             code = f.read()
         
-        obfuscated_code = self.code_obf.obfuscate_code(code, level)
+        obfuscated_code = self.code_obf.obfuscate_code(code, level, **options)
         
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(obfuscated_code)
         
         return output_file
 
+# Loader hasil advanced mode: base64 sekali, XOR tiap layer dengan operasi
+# byte sekaligus, decompress sekali, lalu exec code object (bukan source).
+# Opsi cache menyimpan code object di <script>.obfc seperti .pyc.
+ADVANCED_LOADER = """import {imports}
+def _obf_xor(data, key):
+    size = len(data)
+    repeats, remainder = divmod(size, len(key))
+    stream = key * repeats + key[:remainder]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(stream, 'little')).to_bytes(size, 'little')
+def _obf_load(payload, keys, tag, use_cache):
+    cache_file = None
+    if use_cache and globals().get('__file__'):
+        import os, importlib.util
+        cache_file = os.path.splitext(__file__)[0] + '.obfc'
+        header = importlib.util.MAGIC_NUMBER + bytes.fromhex(tag)
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = f.read()
+            if cached.startswith(header):
+                return marshal.loads(cached[len(header):])
+        except OSError:
+            pass
+    data = base64.b64decode(payload)
+    for key in keys:
+        data = _obf_xor(data, key)
+    data = {decompress}
+    if cache_file:
+        try:
+            with open(cache_file + '.tmp', 'wb') as f:
+                f.write(header + data)
+            os.replace(cache_file + '.tmp', cache_file)
+        except OSError:
+            pass
+    return marshal.loads(data)
+_obf_code = _obf_load({payload!r}, {keys!r}, {tag!r}, {use_cache!r})
+del _obf_xor, _obf_load
+exec(_obf_code)
+"""
+
 class AdvancedObfuscator:
+    KEYS = [b'secret', b'password', b'key123']
+    
     @staticmethod
-    def multi_layer_obfuscate(code: str, layers: int = 3) -> str:
-        current_code = code
+    def multi_layer_obfuscate(code: str, layers: int = 3, cache_code: bool = False,
+                              compression: str = 'zlib', compression_level: int = 9,
+                              seed: Optional[int] = None,
+                              tree: Optional[ast.Module] = None) -> str:
+        """seed diisi = mode deterministik: pemilihan key memakai RNG dengan
+        seed itu dan bytecode di-marshal secara kanonik
+        
+        tree: hasil ast.parse(code) yang sudah ada, dicompile tanpa parse ulang
+        """
+        rng = random.Random(seed) if seed is not None else random
+        compiled = compile(code if tree is None else tree, '<obfuscated>', 'exec')
+        data = compress_payload(
+            dump_code(compiled, deterministic=seed is not None), compression, compression_level
+        )
+        used_keys = []
         
         for i in range(layers):
-            # XOR encryption
-            key = random.choice(['secret', 'password', 'key123'])
-            xor_bytes = bytes(ord(c) ^ ord(key[j % len(key)]) 
-                            for j, c in enumerate(current_code))
-            current_code = base64.b64encode(xor_bytes).decode()
+            # XOR encryption (base64 hanya sekali di akhir, bukan per layer)
+            key = rng.choice(AdvancedObfuscator.KEYS)
+            data = xor_bytes(data, key)
+            used_keys.append(key)
         
-        decoder = f"""
-import base64
-def decode(data):
-    keys = ['secret', 'password', 'key123']
-    for key in reversed(keys[:{layers}]):
-        data = base64.b64decode(data)
-        data = bytes(b ^ ord(key[i % len(key)]) for i, b in enumerate(data))
-    return data.decode()
-
-exec(decode('{current_code}'))
-"""
-        return decoder
+        payload = base64.b64encode(data)
+        
+        return ADVANCED_LOADER.format(
+            imports=loader_imports(compression, 'base64', 'marshal'),
+            decompress=decompress_expr(compression, 'data'),
+            payload=payload.decode('ascii'),
+            keys=list(reversed(used_keys)),
+            tag=hashlib.sha256(payload).hexdigest()[:32],
+            use_cache=cache_code
+        )
@@ -0,0 +1,343 @@
+"""
+Result Cache persisten untuk hasil obfuscation
+Index di SQLite, isi hasil disimpan sebagai blob content-addressed
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict
+
+from obfuscator_core import __version__ as OBFUSCATOR_VERSION
+
+
+class ResultCache:
+    """Cache hasil dengan key (sha256 source, level, mode, versi obfuscator)
+
+    Database memakai WAL, jadi beberapa proses bot bisa berbagi cache yang sama.
+    max_age (detik): entry yang lebih tua tidak dipakai lagi dan dihapus oleh expire()
+    """
+
+    def __init__(self, cache_dir: str = "cache", max_bytes: int = 512 * 1024 * 1024,
+                 max_entries: int = 10000, max_age: Optional[float] = None):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.version = OBFUSCATOR_VERSION
+        self._lock = threading.Lock()
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(cache_dir, "cache.db"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                source_hash TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                mode TEXT NOT NULL,
+                version TEXT NOT NULL,
+                blob_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (source_hash, level, mode, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_access ON results (last_access);
+            CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at);
+            CREATE TABLE IF NOT EXISTS blobs (
+                blob_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                file_unique_id TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                mode TEXT NOT NULL,
+                version TEXT NOT NULL,
+                source_hash TEXT NOT NULL,
+                PRIMARY KEY (file_unique_id, level, mode, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_aliases_source ON aliases (source_hash);
+            CREATE TABLE IF NOT EXISTS sent_documents (
+                blob_hash TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                PRIMARY KEY (blob_hash, filename)
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            -- entries/bytes: total berjalan, diperbarui saat put/hapus (tanpa COUNT/SUM)
+            INSERT OR IGNORE INTO counters VALUES
+                ('hits', 0), ('misses', 0), ('evictions', 0), ('entries', 0), ('bytes', 0);
+        """)
+
+    @contextmanager
+    def _transaction(self):
+        """IMMEDIATE: ambil write lock di awal, supaya dua proses tidak deadlock
+        dan perubahan refcount/counter tidak saling menimpa"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def blob_path(self, blob_hash: str) -> str:
+        """Path blob di disk (dibagi per 2 karakter pertama hash)"""
+        return os.path.join(self.blob_dir, blob_hash[:2], blob_hash)
+
+    def get(self, source_hash: str, level: int, mode: str) -> Optional[str]:
+        """Cari hasil di cache, return path blob atau None"""
+        with self._lock:
+            return self._get((source_hash, level, mode, self.version))
+
+    def get_by_file_id(self, file_unique_id: str, level: int, mode: str) -> Optional[str]:
+        """Cari hasil lewat file_unique_id Telegram (tanpa perlu download/hash)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT source_hash FROM aliases "
+                "WHERE file_unique_id = ? AND level = ? AND mode = ? AND version = ?",
+                (file_unique_id, level, mode, self.version)
+            ).fetchone()
+            if not row:
+                return None
+
+            # Miss di sini tidak dihitung, lookup berdasarkan isi file akan menyusul
+            return self._get((row[0], level, mode, self.version), count_miss=False)
+
+    def add_file_id(self, file_unique_id: str, source_hash: str, level: int, mode: str):
+        """Catat file_unique_id -> hash source, hanya kalau hasilnya ada di cache
+
+        Alias ikut terhapus bersama entry hasilnya (_delete_entry)
+        """
+        key = (source_hash, level, mode, self.version)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO aliases SELECT ?, ?, ?, ?, ? WHERE EXISTS ("
+                "SELECT 1 FROM results "
+                "WHERE source_hash = ? AND level = ? AND mode = ? AND version = ?)",
+                (file_unique_id, level, mode, self.version, source_hash, *key)
+            )
+
+    def get_sent_file_id(self, blob_hash: str, filename: str) -> Optional[str]:
+        """file_id Telegram untuk hasil yang sudah pernah dikirim dengan nama file ini
+
+        Nama file ikut jadi key: dokumen Telegram membawa nama file pengirim
+        pertama, jadi hasil yang sama dengan nama lain harus diupload ulang
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file_id FROM sent_documents WHERE blob_hash = ? AND filename = ?",
+                (blob_hash, filename)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_sent_file_id(self, blob_hash: str, filename: str, file_id: Optional[str]):
+        """Catat (atau hapus jika None) file_id Telegram untuk hasil + nama file"""
+        with self._lock:
+            if file_id:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sent_documents VALUES (?, ?, ?)",
+                    (blob_hash, filename, file_id)
+                )
+            else:
+                self._db.execute(
+                    "DELETE FROM sent_documents WHERE blob_hash = ? AND filename = ?",
+                    (blob_hash, filename)
+                )
+
+    def _get(self, key: tuple, count_miss: bool = True) -> Optional[str]:
+        # Entry kedaluwarsa dianggap tidak ada walaupun expire() belum jalan
+        row = self._db.execute(
+            "SELECT blob_hash FROM results "
+            "WHERE source_hash = ? AND level = ? AND mode = ? AND version = ? "
+            "AND created_at >= ?",
+            (*key, self._cutoff())
+        ).fetchone()
+
+        if row:
+            path = self.blob_path(row[0])
+            if os.path.exists(path):
+                self._db.execute(
+                    "UPDATE results SET last_access = ? "
+                    "WHERE source_hash = ? AND level = ? AND mode = ? AND version = ?",
+                    (time.time(), *key)
+                )
+                self._bump("hits")
+                return path
+
+            # Blob hilang dari disk, buang entry-nya
+            with self._transaction():
+                self._delete_entry(key, row[0])
+
+        if count_miss:
+            self._bump("misses")
+        return None
+
+    def put(self, source_hash: str, level: int, mode: str, data: bytes) -> str:
+        """Simpan hasil ke cache, return path blob"""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(blob_hash)
+        key = (source_hash, level, mode, self.version)
+        now = time.time()
+
+        with self._lock, self._transaction():
+            # Blob ditulis sambil memegang write lock: proses lain tidak bisa
+            # menghapus blob yang sama (refcount 0) di antara tulis dan insert
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+
+            old = self._db.execute(
+                "SELECT blob_hash FROM results "
+                "WHERE source_hash = ? AND level = ? AND mode = ? AND version = ?",
+                key
+            ).fetchone()
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, blob_hash, now, now)
+            )
+            updated = self._db.execute(
+                "UPDATE blobs SET refcount = refcount + 1 WHERE blob_hash = ?", (blob_hash,)
+            ).rowcount
+            if not updated:
+                self._db.execute(
+                    "INSERT INTO blobs VALUES (?, ?, 1)", (blob_hash, len(data))
+                )
+                self._bump("bytes", len(data))
+
+            # Blob lama dilepas setelah blob baru dipakai: kalau sama, file-nya tetap ada
+            if old:
+                self._release_blob(old[0])
+            else:
+                self._bump("entries")
+
+            self._evict()
+
+        return path
+
+    def _cutoff(self) -> float:
+        """created_at paling lama yang masih berlaku"""
+        return time.time() - self.max_age if self.max_age else 0.0
+
+    def expire(self) -> int:
+        """Hapus entry yang lebih tua dari max_age (beserta blob dan alias-nya),
+        return jumlah entry yang dihapus"""
+        if not self.max_age:
+            return 0
+
+        with self._lock, self._transaction():
+            rows = self._db.execute(
+                "SELECT source_hash, level, mode, version, blob_hash FROM results "
+                "WHERE created_at < ?",
+                (self._cutoff(),)
+            ).fetchall()
+            return sum(self._delete_entry(row[:4], row[4]) for row in rows)
+
+    def _evict(self):
+        """Buang entry yang paling lama tidak diakses sampai di bawah batas
+        (dipanggil di dalam transaksi put)"""
+        while True:
+            entries, total_bytes = self._totals()
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                return
+
+            row = self._db.execute(
+                "SELECT source_hash, level, mode, version, blob_hash FROM results "
+                "ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if not row:
+                return
+
+            self._delete_entry(row[:4], row[4])
+            self._bump("evictions")
+
+    def _delete_entry(self, key: tuple, blob_hash: str) -> int:
+        """Hapus entry (harus di dalam transaksi), return 1 kalau memang terhapus
+
+        blob_hash ikut dicocokkan: kalau proses lain sudah menghapus atau
+        mengganti entry ini, refcount blob tidak dikurangi dua kali
+        """
+        deleted = self._db.execute(
+            "DELETE FROM results "
+            "WHERE source_hash = ? AND level = ? AND mode = ? AND version = ? "
+            "AND blob_hash = ?",
+            (*key, blob_hash)
+        ).rowcount
+        if not deleted:
+            return 0
+
+        self._bump("entries", -deleted)
+        self._db.execute(
+            "DELETE FROM aliases "
+            "WHERE source_hash = ? AND level = ? AND mode = ? AND version = ?",
+            key
+        )
+        self._release_blob(blob_hash)
+        return deleted
+
+    def _release_blob(self, blob_hash: str):
+        """Kurangi refcount blob, hapus file kalau sudah tidak dipakai"""
+        self._db.execute(
+            "UPDATE blobs SET refcount = refcount - 1 WHERE blob_hash = ?", (blob_hash,)
+        )
+        row = self._db.execute(
+            "SELECT refcount, size FROM blobs WHERE blob_hash = ?", (blob_hash,)
+        ).fetchone()
+
+        if row and row[0] <= 0:
+            self._db.execute("DELETE FROM blobs WHERE blob_hash = ?", (blob_hash,))
+            self._bump("bytes", -row[1])
+            self._db.execute("DELETE FROM sent_documents WHERE blob_hash = ?", (blob_hash,))
+            try:
+                os.remove(self.blob_path(blob_hash))
+            except OSError:
+                pass
+
+    def _totals(self):
+        """(jumlah entry, total byte blob) dari counter berjalan, tanpa scan tabel"""
+        counters = dict(self._db.execute(
+            "SELECT name, value FROM counters WHERE name IN ('entries', 'bytes')"
+        ).fetchall())
+        return counters['entries'], counters['bytes']
+
+    def _bump(self, name: str, delta: int = 1):
+        self._db.execute("UPDATE counters SET value = value + ? WHERE name = ?", (delta, name))
+
+    def stats(self) -> Dict:
+        """Statistik cache"""
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'entries': counters['entries'],
+            'bytes': counters['bytes'],
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'evictions': counters['evictions'],
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,258 @@
+"""
+State backend untuk rate limit dan aktivitas user
+'memory' untuk satu proses, 'sqlite' (WAL) supaya beberapa proses bot di
+satu host berbagi state yang sama (rate limit tetap benar antar proses)
+
+Yang dibagi hanya rate limit dan aktivitas user. State percakapan
+python-telegram-bot (context.user_data) tetap per proses, jadi beberapa
+proses butuh webhook yang meneruskan update satu chat selalu ke proses
+yang sama; run_polling dengan token yang sama hanya boleh di satu proses.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+
+class TokenBucket:
+    """State token bucket (memori konstan per key)"""
+    __slots__ = ('tokens', 'updated', 'cooldown_until')
+
+    def __init__(self, tokens: float, now: float, cooldown_until: float = 0.0):
+        self.tokens = tokens
+        self.updated = now
+        self.cooldown_until = cooldown_until
+
+    def refill(self, capacity: float, now: float):
+        """Isi ulang token sesuai waktu yang berlalu (rate = capacity per menit)"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(capacity, self.tokens + elapsed * capacity / 60.0)
+        self.updated = now
+
+
+class MemoryStateBackend:
+    """State di memori proses ini"""
+
+    def __init__(self, idle_ttl: float = 3600):
+        self.idle_ttl = idle_ttl
+        # Urut dari yang paling lama tidak aktif, untuk eviction O(1)
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.activity: Dict[int, Dict] = {}
+        self.files: Dict[int, Dict] = {}
+
+    def clock(self) -> float:
+        return time.monotonic()
+
+    @contextmanager
+    def token_buckets(self, capacities: Dict[str, float]) -> Iterator[Dict[str, TokenBucket]]:
+        """Bucket untuk key-key ini (dibuat penuh kalau belum ada); perubahan
+        pada bucket otomatis tersimpan"""
+        now = self.clock()
+        result = {}
+        for key, capacity in capacities.items():
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(capacity, now)
+            else:
+                self.buckets.move_to_end(key)
+            result[key] = bucket
+
+        self._evict_idle(now, keep=result)
+        yield result
+
+    def _evict_idle(self, now: float, keep: Dict[str, TokenBucket]):
+        """Buang bucket yang sudah lama idle (bucket penuh = sama dengan tidak ada)"""
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if (key in keep or now - bucket.updated < self.idle_ttl
+                    or bucket.cooldown_until > now):
+                break
+            del self.buckets[key]
+
+    def record_request(self, user_id: int):
+        activity = self.activity.setdefault(user_id, {'total_requests': 0, 'last_request': None})
+        activity['total_requests'] += 1
+        activity['last_request'] = datetime.now()
+
+    def record_file(self, user_id: int, file_key: str, info: Dict):
+        self.files.setdefault(user_id, {})[file_key] = {**info, 'timestamp': datetime.now()}
+
+    def user_stats(self, user_id: int) -> Dict:
+        activity = self.activity.get(user_id, {})
+        return {
+            'total_requests': activity.get('total_requests', 0),
+            'files_processed': len(self.files.get(user_id, ())),
+            'last_request': activity.get('last_request')
+        }
+
+    def total_users(self) -> int:
+        return len(self.activity)
+
+    def active_users(self, within_seconds: int) -> int:
+        since = datetime.now().timestamp() - within_seconds
+        return sum(
+            1 for activity in self.activity.values()
+            if activity['last_request'] and activity['last_request'].timestamp() >= since
+        )
+
+    def close(self):
+        pass
+
+
+class SQLiteStateBackend:
+    """State di SQLite (WAL), aman dipakai beberapa proses sekaligus
+
+    Setiap operasi bucket berjalan dalam satu transaksi BEGIN IMMEDIATE,
+    jadi cek + pakai token bersifat atomik antar proses.
+    """
+
+    # Bersihkan bucket idle setiap sekian transaksi
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, path: str, idle_ttl: float = 3600):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid = None
+        self._ops = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Koneksi per proses: koneksi SQLite tidak boleh dibawa melewati fork
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    cooldown_until REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS activity (
+                    user_id INTEGER PRIMARY KEY,
+                    total_requests INTEGER NOT NULL,
+                    last_request REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_activity_last ON activity (last_request);
+                CREATE TABLE IF NOT EXISTS files (
+                    user_id INTEGER NOT NULL,
+                    file_key TEXT NOT NULL,
+                    info TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (user_id, file_key)
+                );
+            """)
+            self._db_pid = os.getpid()
+        return self._db
+
+    def clock(self) -> float:
+        # Waktu dinding, karena dibandingkan antar proses dan setelah restart
+        return time.time()
+
+    @contextmanager
+    def token_buckets(self, capacities: Dict[str, float]) -> Iterator[Dict[str, TokenBucket]]:
+        """Baca bucket, yield untuk diubah, lalu simpan; semuanya dalam satu transaksi"""
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                result = {}
+                for key, capacity in capacities.items():
+                    row = db.execute(
+                        "SELECT tokens, updated, cooldown_until FROM buckets WHERE key = ?",
+                        (key,)
+                    ).fetchone()
+                    result[key] = TokenBucket(*row) if row else TokenBucket(capacity, now)
+
+                yield result
+
+                db.executemany(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                    [(key, b.tokens, b.updated, b.cooldown_until) for key, b in result.items()]
+                )
+
+                self._ops += 1
+                if self._ops % self.PRUNE_INTERVAL == 0:
+                    db.execute(
+                        "DELETE FROM buckets WHERE updated < ? AND cooldown_until < ?",
+                        (now - self.idle_ttl, now)
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def record_request(self, user_id: int):
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO activity VALUES (?, 1, ?) ON CONFLICT(user_id) DO UPDATE "
+                "SET total_requests = total_requests + 1, last_request = excluded.last_request",
+                (user_id, time.time())
+            )
+
+    def record_file(self, user_id: int, file_key: str, info: Dict):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (user_id, file_key, json.dumps(info, default=str), time.time())
+            )
+
+    def user_stats(self, user_id: int) -> Dict:
+        with self._lock:
+            db = self._connection()
+            activity = db.execute(
+                "SELECT total_requests, last_request FROM activity WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+            files = db.execute(
+                "SELECT COUNT(*) FROM files WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+        return {
+            'total_requests': activity[0] if activity else 0,
+            'files_processed': files,
+            'last_request': datetime.fromtimestamp(activity[1]) if activity else None
+        }
+
+    def total_users(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM activity").fetchone()[0]
+
+    def active_users(self, within_seconds: int) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM activity WHERE last_request >= ?",
+                (time.time() - within_seconds,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def create_backend(kind: str, path: Optional[str] = None, idle_ttl: float = 3600):
+    """Buat backend dari nama ('memory' atau 'sqlite')"""
+    if kind == 'memory':
+        return MemoryStateBackend(idle_ttl)
+    if kind == 'sqlite':
+        if not path:
+            raise ValueError("Backend sqlite butuh path database")
+        return SQLiteStateBackend(path, idle_ttl)
+    raise ValueError(f"State backend tidak dikenal: {kind}")
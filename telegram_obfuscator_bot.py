@@ -5,31 +5,46 @@ Fitur: Upload file .py -> Terima file terobfuscate
 Dengan sistem auto-update dan logging
 """
 
+import io
 import os
 import sys
 import logging
 import asyncio
 import json
 import hashlib
-import tempfile
-import shutil
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple
+import math
+import re
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple, Union
+
+import httpx
 
 # Telegram Bot
 from telegram import Update, Bot, InputFile
 from telegram.ext import (
     Application, 
+    BaseUpdateProcessor,
     CommandHandler, 
     MessageHandler, 
     filters, 
     ContextTypes,
     CallbackContext
 )
+from telegram.error import BadRequest
 
 # Import obfuscator modules
-from obfuscator_core import PythonObfuscator, FileObfuscator, AdvancedObfuscator
+from obfuscator_core import (
+    PythonObfuscator, FileObfuscator, AdvancedObfuscator, DefinitionCache
+)
 from update_system import UpdateSystem
+from worker_pool import (
+    ObfuscationPool, JobTimeoutError, JobResourceError, JobKilledError,
+    scan_and_obfuscate
+)
+from result_cache import ResultCache
+from job_scheduler import FairScheduler, QueueFullError
+from state_backend import create_backend
+from batch_obfuscator import ArchiveObfuscator, ArchiveError, is_archive, completed_future
 
 # ============================================================================
 # Konfigurasi
@@ -46,23 +61,136 @@ class Config:
     # Update channel untuk notifikasi
     UPDATE_CHANNEL = "@TrafashiNight"
     
-    # Path untuk file
-    UPLOAD_FOLDER = "uploads"
-    OUTPUT_FOLDER = "outputs"
+    # Path untuk file (upload diproses di memori, hanya log dan cache di disk)
     LOG_FOLDER = "logs"
+    CACHE_FOLDER = "cache"
     
     # Batasan file
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    ALLOWED_EXTENSIONS = {'.py'}
+    ALLOWED_EXTENSIONS = {'.py', '.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz'}
     
-    # Rate limiting
+    # Download di-stream per chunk: hash + cek ukuran dilakukan sambil data masuk
+    DOWNLOAD_CHUNK_SIZE = 256 * 1024
+    DOWNLOAD_TIMEOUT = 60  # detik
+    
+    # Arsip project (zip/tar): batas isi supaya aman dari zip bomb
+    ARCHIVE_MAX_MEMBERS = 500
+    ARCHIVE_MAX_UNPACKED_SIZE = 100 * 1024 * 1024  # 100MB
+    ARCHIVE_MAX_RATIO = 100
+    # Baca/tulis arsip jalan di thread bot (di luar batas resource worker),
+    # jadi satu arsip dibatasi waktunya, termasuk menunggu job .py-nya
+    ARCHIVE_TIMEOUT = 300  # detik
+    
+    # Rate limiting (token bucket, bisa diatur lewat config.json)
     REQUESTS_PER_MINUTE = 5
+    GLOBAL_REQUESTS_PER_MINUTE = 120
     USER_COOLDOWN = 30  # detik
+    RATE_LIMIT_IDLE_TTL = 3600  # detik, state user idle dibuang
+    
+    # State rate limit + aktivitas user: 'memory' (satu proses) atau 'sqlite'
+    # (WAL, dipakai bersama beberapa proses bot di host yang sama).
+    # Catatan: state percakapan (context.user_data, file yang menunggu pilihan
+    # level) tetap per proses, dan run_polling hanya boleh jalan di satu proses
+    # per token. Beberapa proses hanya benar lewat webhook dengan proxy yang
+    # selalu meneruskan chat yang sama ke proses yang sama (sharding per chat_id).
+    STATE_BACKEND = 'memory'
+    STATE_DB = os.path.join("cache", "state.db")
+    
+    # Cache hasil (persisten, LRU dengan batas ukuran)
+    CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+    CACHE_MAX_ENTRIES = 10000
+    # Hasil dan cache per definisi (berisi string asli user) dihapus setelah
+    # umur ini, sesuai pesan ke user ("dihapus setelah 24 jam")
+    CACHE_MAX_AGE = 24 * 3600  # detik
+    
+    # Worker pool obfuscation (0 = jalankan di thread, tanpa pool proses dan
+    # tanpa isolasi: file yang berat bisa menghabiskan memori proses bot)
+    WORKER_POOL_SIZE = os.cpu_count() or 1
+    JOB_TIMEOUT = 120  # detik per job (wall clock)
+    JOB_CPU_LIMIT = 90  # detik CPU per job (RLIMIT_CPU)
+    WORKER_MEMORY_LIMIT = 512 * 1024 * 1024  # byte per worker (RLIMIT_AS, di atas pemakaian awal)
+    WORKER_MAX_TASKS = 100  # pool diganti baru setelah rata-rata sekian job per worker
+    
+    # Advanced mode: simpan code object hasil decode di <script>.obfc (seperti .pyc)
+    ADVANCED_CODE_CACHE = False
+    
+    # Cache per def/class top-level (level 1-2): upload ulang dengan sedikit
+    # perubahan hanya memproses definisi yang berubah
+    DEFINITION_CACHE = True
+    DEFINITION_CACHE_ENTRIES = 5000
+    
+    # String encoding level 2: 'table' (decode sekali saat import) atau 'inline'
+    STRING_MODE = 'table'
+    
+    # Seed obfuscation: None = key advanced acak, angka = output deterministik
+    # (input, level dan seed sama -> byte sama, cache bisa dipakai bersama antar node)
+    OBFUSCATION_SEED = None
+    
+    # Kompresi payload level 3 dan advanced ('zlib', 'lzma' atau 'none')
+    COMPRESSION = 'zlib'
+    COMPRESSION_LEVEL = 9
+    
+    # Update Telegram diproses concurrent (tetap berurutan per chat)
+    CONCURRENT_UPDATES = 64
+    
+    # Antrian job (adil per user, admin dapat prioritas)
+    MAX_CONCURRENT_JOBS = WORKER_POOL_SIZE or 2
+    MAX_QUEUED_JOBS = 50
+    MAX_QUEUED_JOBS_PER_USER = 2
+    
+    # Mapping key config.json -> atribut Config
+    CONFIG_FILE = "config.json"
+    CONFIG_KEYS = {
+        'bot_token': 'BOT_TOKEN',
+        'admin_ids': 'ADMIN_IDS',
+        'update_channel': 'UPDATE_CHANNEL',
+        'rate_limit_per_minute': 'REQUESTS_PER_MINUTE',
+        'global_rate_limit_per_minute': 'GLOBAL_REQUESTS_PER_MINUTE',
+        'user_cooldown_seconds': 'USER_COOLDOWN',
+        'state_backend': 'STATE_BACKEND',
+        'state_db': 'STATE_DB',
+        'string_mode': 'STRING_MODE',
+        'definition_cache': 'DEFINITION_CACHE',
+        'compression': 'COMPRESSION',
+        'obfuscation_seed': 'OBFUSCATION_SEED',
+        'compression_level': 'COMPRESSION_LEVEL',
+        'job_cpu_limit_seconds': 'JOB_CPU_LIMIT',
+        'worker_max_tasks': 'WORKER_MAX_TASKS',
+    }
+    
+    @classmethod
+    def load_file(cls, path: Optional[str] = None):
+        """Baca config.json dan timpa nilai default"""
+        path = path or cls.CONFIG_FILE
+        if not os.path.exists(path):
+            return
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Gagal membaca {path}: {e}")
+            return
+        
+        for key, attr in cls.CONFIG_KEYS.items():
+            if key in data:
+                setattr(cls, attr, data[key])
+        
+        if 'max_file_size_mb' in data:
+            cls.MAX_FILE_SIZE = int(data['max_file_size_mb']) * 1024 * 1024
+        if 'worker_memory_limit_mb' in data:
+            cls.WORKER_MEMORY_LIMIT = int(data['worker_memory_limit_mb']) * 1024 * 1024
+    
+    @classmethod
+    def allowed_file(cls, filename: str) -> bool:
+        """Cek ekstensi file (termasuk ekstensi ganda seperti .tar.gz)"""
+        name = filename.lower()
+        return any(name.endswith(ext) for ext in cls.ALLOWED_EXTENSIONS)
     
     @classmethod
     def init_folders(cls):
         """Buat folder yang diperlukan"""
-        folders = [cls.UPLOAD_FOLDER, cls.OUTPUT_FOLDER, cls.LOG_FOLDER]
+        folders = [cls.LOG_FOLDER, cls.CACHE_FOLDER]
         for folder in folders:
             os.makedirs(folder, exist_ok=True)
 
@@ -89,239 +217,661 @@ def setup_logging():
     
     return logging.getLogger(__name__)
 
-logger = setup_logging()
+# Handler logging dipasang di main(); saat di-import (termasuk sebagai
+# __mp_main__ di worker pool) module ini tidak punya efek samping
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # User Management & Rate Limiting
 # ============================================================================
 
+class RateLimiter:
+    """Rate limiter token bucket per user + global, O(1) per request
+    
+    State bucket disimpan di state backend, jadi bisa dipakai bersama
+    beberapa proses bot (backend sqlite). try_acquire mengecek dan memakai
+    token dalam satu transaksi, jadi atomik antar proses
+    """
+    
+    GLOBAL_KEY = 'global'
+    
+    def __init__(self, per_minute: int, global_per_minute: int, cooldown: int, backend):
+        self.per_minute = per_minute
+        self.global_per_minute = global_per_minute
+        self.cooldown = cooldown
+        self.backend = backend
+    
+    def _buckets(self, user_id: int):
+        return self.backend.token_buckets({
+            f"user:{user_id}": self.per_minute,
+            self.GLOBAL_KEY: self.global_per_minute
+        })
+    
+    def _evaluate(self, user_id: int, buckets: Dict) -> Tuple[bool, str]:
+        """Refill bucket lalu cek apakah ada token (di dalam transaksi _buckets)"""
+        now = self.backend.clock()
+        bucket = buckets[f"user:{user_id}"]
+        global_bucket = buckets[self.GLOBAL_KEY]
+        
+        # Cek cooldown
+        if bucket.cooldown_until > now:
+            remaining = math.ceil(bucket.cooldown_until - now)
+            return False, f"Silakan tunggu {remaining} detik sebelum request lagi"
+        
+        # Rate limiting per user
+        bucket.refill(self.per_minute, now)
+        if bucket.tokens < 1:
+            bucket.cooldown_until = now + self.cooldown
+            return False, f"Rate limit tercapai. Tunggu {self.cooldown} detik"
+        
+        # Rate limiting global
+        global_bucket.refill(self.global_per_minute, now)
+        if global_bucket.tokens < 1:
+            wait = (1 - global_bucket.tokens) * 60.0 / self.global_per_minute
+            return False, f"Bot sedang sibuk. Coba lagi dalam {math.ceil(wait)} detik"
+        
+        return True, ""
+    
+    def check(self, user_id: int) -> Tuple[bool, str]:
+        """Cek tanpa memakai token"""
+        with self._buckets(user_id) as buckets:
+            return self._evaluate(user_id, buckets)
+    
+    def try_acquire(self, user_id: int) -> Tuple[bool, str]:
+        """Cek dan pakai satu token user + global dalam satu transaksi"""
+        with self._buckets(user_id) as buckets:
+            allowed, message = self._evaluate(user_id, buckets)
+            if allowed:
+                buckets[f"user:{user_id}"].tokens -= 1
+                buckets[self.GLOBAL_KEY].tokens -= 1
+            return allowed, message
+    
+    def consume(self, user_id: int):
+        """Pakai satu token user dan global"""
+        with self._buckets(user_id) as buckets:
+            now = self.backend.clock()
+            
+            bucket = buckets[f"user:{user_id}"]
+            bucket.refill(self.per_minute, now)
+            bucket.tokens = max(0.0, bucket.tokens - 1)
+            
+            global_bucket = buckets[self.GLOBAL_KEY]
+            global_bucket.refill(self.global_per_minute, now)
+            global_bucket.tokens = max(0.0, global_bucket.tokens - 1)
+
 class UserManager:
     """Manajemen user dan rate limiting"""
     
-    def __init__(self):
-        self.user_requests: Dict[int, List[datetime]] = {}
-        self.user_files: Dict[int, Dict] = {}
-        self.cooldown_users: Dict[int, datetime] = {}
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend(
+            Config.STATE_BACKEND, Config.STATE_DB, Config.RATE_LIMIT_IDLE_TTL
+        )
+        self.rate_limiter = RateLimiter(
+            per_minute=Config.REQUESTS_PER_MINUTE,
+            global_per_minute=Config.GLOBAL_REQUESTS_PER_MINUTE,
+            cooldown=Config.USER_COOLDOWN,
+            backend=self.backend
+        )
     
     def can_make_request(self, user_id: int) -> Tuple[bool, str]:
         """Cek apakah user bisa membuat request"""
-        now = datetime.now()
-        
-        # Cek cooldown
-        if user_id in self.cooldown_users:
-            cooldown_end = self.cooldown_users[user_id]
-            if now < cooldown_end:
-                remaining = (cooldown_end - now).seconds
-                return False, f"Silakan tunggu {remaining} detik sebelum request lagi"
-        
-        # Rate limiting per menit
-        if user_id in self.user_requests:
-            user_reqs = self.user_requests[user_id]
-            # Hapus request lebih dari 1 menit yang lalu
-            user_reqs = [req for req in user_reqs if (now - req).seconds < 60]
-            self.user_requests[user_id] = user_reqs
-            
-            if len(user_reqs) >= Config.REQUESTS_PER_MINUTE:
-                self.cooldown_users[user_id] = now + timedelta(seconds=Config.USER_COOLDOWN)
-                return False, f"Rate limit tercapai. Tunggu {Config.USER_COOLDOWN} detik"
-        
-        return True, ""
+        return self.rate_limiter.check(user_id)
+    
+    def try_request(self, user_id: int) -> Tuple[bool, str]:
+        """Cek rate limit dan catat request sekaligus (atomik antar proses)"""
+        allowed, message = self.rate_limiter.try_acquire(user_id)
+        if allowed:
+            self.backend.record_request(user_id)
+        return allowed, message
     
     def add_request(self, user_id: int):
-        """Tambahkan request user"""
-        if user_id not in self.user_requests:
-            self.user_requests[user_id] = []
-        self.user_requests[user_id].append(datetime.now())
+        """Tambahkan request user (tanpa cek rate limit)"""
+        self.rate_limiter.consume(user_id)
+        self.backend.record_request(user_id)
+    
+    def total_users(self) -> int:
+        """Jumlah user yang pernah request"""
+        return self.backend.total_users()
+    
+    def active_users(self, within_seconds: int = 86400) -> int:
+        """Jumlah user yang aktif dalam rentang waktu"""
+        return self.backend.active_users(within_seconds)
     
     def track_file(self, user_id: int, file_info: Dict):
         """Track file yang diupload user"""
-        if user_id not in self.user_files:
-            self.user_files[user_id] = {}
-        
         file_hash = file_info.get('hash', 'unknown')
-        self.user_files[user_id][file_hash] = {
-            **file_info,
-            'timestamp': datetime.now()
-        }
+        self.backend.record_file(user_id, file_hash, file_info)
     
     def get_user_stats(self, user_id: int) -> Dict:
         """Dapatkan statistik user"""
-        stats = {
-            'total_requests': 0,
-            'files_processed': 0,
-            'last_request': None
-        }
-        
-        if user_id in self.user_requests:
-            stats['total_requests'] = len(self.user_requests[user_id])
-            if self.user_requests[user_id]:
-                stats['last_request'] = self.user_requests[user_id][-1]
-        
-        if user_id in self.user_files:
-            stats['files_processed'] = len(self.user_files[user_id])
-        
-        return stats
+        return self.backend.user_stats(user_id)
 
-user_manager = UserManager()
+user_manager: Optional[UserManager] = None
 
 # ============================================================================
 # File Processing
 # ============================================================================
 
+def definition_cache_path() -> str:
+    """File SQLite cache per definisi (dipakai bersama oleh semua worker)"""
+    os.makedirs(Config.CACHE_FOLDER, exist_ok=True)
+    return os.path.join(Config.CACHE_FOLDER, "definitions.db")
+
+class DownloadTooLargeError(Exception):
+    """Isi download melebihi batas ukuran"""
+
+class DownloadError(Exception):
+    """Download dari Telegram gagal (pesan aman untuk user, tanpa URL/token)"""
+
+def redact_token(text: str) -> str:
+    """Sembunyikan token bot di URL file Telegram (.../file/bot<token>/...)"""
+    return re.sub(r'/bot[^/\s]+/', '/bot<token>/', text)
+
+class DownloadBuffer(io.BytesIO):
+    """Buffer download di memori dengan batas ukuran, SHA256 dihitung sambil ditulis
+    
+    Hanya untuk penulisan berurutan (seperti download), tanpa seek mundur
+    """
+    
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+        self._sha256 = hashlib.sha256()
+    
+    def check_size(self, size: int):
+        if size > self.max_size:
+            raise DownloadTooLargeError(
+                f"File terlalu besar. Maks: {self.max_size // 1024 // 1024}MB"
+            )
+    
+    def write(self, data) -> int:
+        self.check_size(self.tell() + len(data))
+        self._sha256.update(data)
+        return super().write(data)
+    
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+class StreamingDownloader:
+    """Download file Telegram per chunk langsung ke DownloadBuffer
+    
+    File yang terlalu besar ditolak dari header Content-Length atau begitu
+    batas terlewati di tengah stream, tanpa menunggu download selesai
+    """
+    
+    def __init__(self, chunk_size: int, timeout: float):
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    async def download(self, file, max_size: int) -> DownloadBuffer:
+        """Download file (telegram.File), return buffer berisi isi + SHA256"""
+        buffer = DownloadBuffer(max_size)
+        if file.file_size:
+            buffer.check_size(file.file_size)
+        
+        if not file.file_path.startswith(('http://', 'https://')):
+            # Bot API server lokal (--local): file_path adalah path di disk
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._read_local, file.file_path, buffer)
+            except OSError as e:
+                logger.error(f"Gagal membaca file lokal Bot API: {e}")
+                raise DownloadError("Gagal mengambil file dari Telegram, silakan coba lagi") from None
+            return buffer
+        
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        
+        # Pesan error httpx berisi URL lengkap (termasuk token bot): hanya
+        # dicatat di log setelah token disembunyikan, user dapat pesan umum
+        try:
+            async with self._client.stream('GET', file.file_path) as response:
+                response.raise_for_status()
+                length = response.headers.get('content-length')
+                if length and length.isdigit():
+                    buffer.check_size(int(length))
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    buffer.write(chunk)
+        except httpx.HTTPError as e:
+            logger.error(f"Download file Telegram gagal: {type(e).__name__}: "
+                         f"{redact_token(str(e))}")
+            raise DownloadError("Gagal mendownload file dari Telegram, silakan coba lagi") from None
+        
+        return buffer
+    
+    def _read_local(self, path: str, buffer: DownloadBuffer):
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                buffer.write(chunk)
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 class FileProcessor:
     """Processor untuk file Python"""
     
-    def __init__(self):
-        self.obfuscator = FileObfuscator()
+    def __init__(self, pool: Optional[ObfuscationPool] = None):
+        self.obfuscator = FileObfuscator(
+            DefinitionCache(Config.DEFINITION_CACHE_ENTRIES, definition_cache_path(),
+                            max_age=Config.CACHE_MAX_AGE)
+            if Config.DEFINITION_CACHE else None
+        )
         self.advanced_obf = AdvancedObfuscator()
-        self.file_hashes: Dict[str, Dict] = {}
-    
-    def calculate_file_hash(self, file_path: str) -> str:
-        """Hitung hash SHA256 dari file"""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-    
-    def validate_file(self, file_path: str) -> Tuple[bool, str]:
-        """Validasi file Python"""
+        self.result_cache = ResultCache(
+            Config.CACHE_FOLDER,
+            max_bytes=Config.CACHE_MAX_BYTES,
+            max_entries=Config.CACHE_MAX_ENTRIES,
+            max_age=Config.CACHE_MAX_AGE
+        )
+        self.pool = pool
+    
+    def check_limits(self, size: int, filename: str) -> Tuple[bool, str]:
+        """Cek ukuran dan ekstensi tanpa melihat isi"""
+        if size > Config.MAX_FILE_SIZE:
+            return False, f"File terlalu besar ({size} bytes). Maks: {Config.MAX_FILE_SIZE} bytes"
+        
+        if not Config.allowed_file(filename):
+            return False, "Hanya file .py atau arsip .zip/.tar yang diperbolehkan"
+        
+        return True, ""
+    
+    def log_findings(self, filename: str, findings: List[Dict]):
+        """Catat konstruksi berisiko (tidak langsung ditolak)
+        
+        Finding dari member arsip membawa key 'file' (nama member)
+        """
+        if findings:
+            sites = ", ".join(
+                f"{f['kind']} {f['name']} ("
+                + (f"{f['file']} " if 'file' in f else "")
+                + f"baris {f['line']})"
+                for f in findings[:20]
+            )
+            more = f" +{len(findings) - 20} lainnya" if len(findings) > 20 else ""
+            logger.warning(f"Potensi kode berbahaya di {filename}: {sites}{more}")
+    
+    def lookup_file_id(self, file_unique_id: Optional[str], level: int,
+                       advanced: bool) -> Optional[bytes]:
+        """Cek cache lewat file_unique_id Telegram sebelum download"""
+        if not file_unique_id:
+            return None
+        
+        cached_path = self.result_cache.get_by_file_id(
+            file_unique_id, level, self._cache_mode(advanced)
+        )
+        if cached_path:
+            logger.info(f"Cache hit untuk file_unique_id {file_unique_id}")
+            return self._read_cached(cached_path)
+        return None
+    
+    def _lookup(self, data: bytes, level: int, advanced: bool,
+                file_unique_id: Optional[str] = None,
+                file_hash: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """Cek cache sebelum parsing apapun
+        
+        Return (hasil_dari_cache_atau_None, file_hash); hash hanya dihitung
+        kalau belum dihitung saat download
+        """
+        file_hash = file_hash or hashlib.sha256(data).hexdigest()
+        
+        # Cek cache (jangan proses file yang sama berulang)
+        cached = self._get_cached_output(file_hash, level, advanced)
+        if cached is not None:
+            self._remember_file_id(file_unique_id, file_hash, level, advanced)
+        return cached, file_hash
+    
+    def _ingest(self, data: bytes, filename: str, level: int, advanced: bool,
+                file_unique_id: Optional[str] = None,
+                file_hash: Optional[str] = None) -> Tuple[Optional[bytes], Optional[str], str]:
+        """Cek cache lalu decode source dari buffer yang sama
+        
+        Return (hasil_dari_cache, code, file_hash_atau_pesan_error)
+        """
+        is_valid, message = self.check_limits(len(data), filename)
+        if not is_valid:
+            return None, None, message
+        
+        cached, file_hash = self._lookup(data, level, advanced, file_unique_id, file_hash)
+        if cached is not None:
+            return cached, None, file_hash
+        
+        try:
+            code = data.decode('utf-8')
+        except UnicodeDecodeError:
+            return None, None, "File harus berupa teks UTF-8"
+        
+        return None, code, file_hash
+    
+    def process_file(self, data: bytes, filename: str, user_id: int, level: int = 2,
+                    advanced: bool = False, file_unique_id: Optional[str] = None,
+                    file_hash: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """Process file untuk obfuscation, input dan hasil di memori
+        
+        Return (isi_hasil, pesan); isi_hasil None kalau gagal
+        """
+        if is_archive(filename):
+            return self.process_archive(data, filename, user_id, level, advanced,
+                                        file_unique_id, file_hash=file_hash)
+        
         try:
-            # Cek ukuran
-            file_size = os.path.getsize(file_path)
-            if file_size > Config.MAX_FILE_SIZE:
-                return False, f"File terlalu besar ({file_size} bytes). Maks: {Config.MAX_FILE_SIZE} bytes"
+            cached, code, file_hash = self._ingest(
+                data, filename, level, advanced, file_unique_id, file_hash
+            )
+            if cached is not None:
+                return cached, "Berhasil (dari cache)"
+            if code is None:
+                return None, file_hash
+            
+            # Proses obfuscation
+            logger.info(f"Processing file {filename} untuk user {user_id}, level {level}")
+            
+            # Satu parse untuk scan risiko, validasi sintaks dan obfuscation
+            obfuscated_code, findings = scan_and_obfuscate(
+                code, filename, level, advanced, self.obfuscation_options(advanced),
+                code_obf=self.obfuscator.code_obf, advanced_obf=self.advanced_obf
+            )
+            self.log_findings(filename, findings)
             
-            # Cek ekstensi
-            if not file_path.lower().endswith('.py'):
-                return False, "Hanya file .py yang diperbolehkan"
+            # Disk hanya dipakai untuk cache
+            result = obfuscated_code.encode('utf-8')
+            self._remember(file_hash, level, advanced, result, file_unique_id)
             
-            # Cek apakah valid Python
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            return result, "Obfuscation berhasil"
+            
+        except SyntaxError as e:
+            return None, f"Error sintaks Python: {str(e)}"
+        except Exception as e:
+            logger.error(f"Error processing file: {e}", exc_info=True)
+            return None, "Terjadi error saat memproses file"
+    
+    async def process_file_async(self, data: bytes, filename: str, user_id: int,
+                                 level: int = 2, advanced: bool = False,
+                                 file_unique_id: Optional[str] = None,
+                                 file_hash: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """Process file di worker pool tanpa memblokir event loop"""
+        loop = asyncio.get_running_loop()
+        if self.pool is None:
+            return await loop.run_in_executor(
+                None, self.process_file, data, filename, user_id, level, advanced,
+                file_unique_id, file_hash
+            )
+        
+        if is_archive(filename):
+            # Baca/tulis arsip di thread, job .py tetap dikirim ke worker pool
+            return await loop.run_in_executor(
+                None, self.process_archive, data, filename, user_id, level, advanced,
+                file_unique_id, loop, file_hash
+            )
+        
+        try:
+            # Cache (SQLite, bisa menunggu lock proses lain) diakses di thread
+            cached, code, file_hash = await loop.run_in_executor(
+                None, self._ingest, data, filename, level, advanced, file_unique_id, file_hash
+            )
+            if cached is not None:
+                return cached, "Berhasil (dari cache)"
+            if code is None:
+                return None, file_hash
             
-            # Coba compile untuk validasi sintaks
-            compile(content, file_path, 'exec')
+            logger.info(f"Processing file {filename} untuk user {user_id}, level {level} (pool)")
             
-            # Cek untuk kode berbahaya
-            dangerous_patterns = [
-                'import os.system',
-                'import subprocess',
-                'eval(',
-                'exec(',
-                '__import__',
-                'open(',
-                'compile('
-            ]
+            # Parse, scan risiko dan validasi sintaks semuanya di worker
+            obfuscated_code, findings = await self.pool.run(
+                scan_and_obfuscate, code, filename, level, advanced,
+                self.obfuscation_options(advanced),
+                timeout=Config.JOB_TIMEOUT
+            )
+            self.log_findings(filename, findings)
             
-            for pattern in dangerous_patterns:
-                if pattern in content:
-                    logger.warning(f"Potensi kode berbahaya: {pattern}")
-                    # Tidak langsung ditolak, tapi dicatat
+            result = obfuscated_code.encode('utf-8')
+            await loop.run_in_executor(
+                None, self._remember, file_hash, level, advanced, result, file_unique_id
+            )
             
-            return True, "File valid"
+            return result, "Obfuscation berhasil"
             
+        except JobTimeoutError:
+            logger.warning(f"Job timeout untuk user {user_id}: {filename}")
+            return None, (f"Proses terlalu lama (batas {Config.JOB_TIMEOUT} detik / "
+                          f"{Config.JOB_CPU_LIMIT} detik CPU). Coba level lebih rendah "
+                          f"atau pecah file menjadi beberapa bagian")
+        except JobResourceError as e:
+            logger.warning(f"Job melewati batas resource untuk user {user_id}: {filename}: {e}")
+            return None, (f"File terlalu berat untuk diproses ({e}). Coba level lebih "
+                          f"rendah atau pecah file menjadi beberapa bagian")
+        except JobKilledError:
+            logger.error(f"Worker mati saat memproses file user {user_id}: {filename}")
+            return None, ("Proses dihentikan karena worker berhenti saat memproses file ini. "
+                          "Kemungkinan file terlalu berat; coba level lebih rendah")
         except SyntaxError as e:
-            return False, f"Error sintaks Python: {str(e)}"
+            return None, f"Error sintaks Python: {str(e)}"
         except Exception as e:
-            return False, f"Error validasi: {str(e)}"
+            logger.error(f"Error processing file: {e}", exc_info=True)
+            return None, "Terjadi error saat memproses file"
     
-    def process_file(self, file_path: str, user_id: int, level: int = 2, 
-                    advanced: bool = False) -> Tuple[Optional[str], str]:
-        """Process file untuk obfuscation"""
+    def process_archive(self, data: bytes, filename: str, user_id: int, level: int = 2,
+                        advanced: bool = False, file_unique_id: Optional[str] = None,
+                        loop: Optional[asyncio.AbstractEventLoop] = None,
+                        file_hash: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """Obfuscate semua .py dalam arsip zip/tar, hasil satu arsip dengan format sama
+        
+        Arsip dibaca dan ditulis di memori. Kalau loop diberikan, tiap file .py
+        dikirim ke worker pool lewat loop itu
+        """
         try:
-            # Validasi file
-            is_valid, message = self.validate_file(file_path)
+            is_valid, message = self.check_limits(len(data), filename)
             if not is_valid:
                 return None, message
             
-            # Hitung hash
-            file_hash = self.calculate_file_hash(file_path)
-            
-            # Cek cache (jangan proses file yang sama berulang)
-            cache_key = f"{file_hash}_{level}_{advanced}"
-            if cache_key in self.file_hashes:
-                cached = self.file_hashes[cache_key]
-                if os.path.exists(cached['output_path']):
-                    logger.info(f"Cache hit untuk file {file_hash}")
-                    return cached['output_path'], "Berhasil (dari cache)"
-            
-            # Baca file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
+            cached, file_hash = self._lookup(data, level, advanced, file_unique_id, file_hash)
+            if cached is not None:
+                return cached, "Berhasil (dari cache)"
             
-            # Generate nama output
-            original_name = os.path.basename(file_path)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_name = f"obf_{user_id}_{timestamp}_{original_name}"
-            output_path = os.path.join(Config.OUTPUT_FOLDER, output_name)
+            logger.info(f"Processing arsip {filename} untuk user {user_id}, level {level}")
             
-            # Proses obfuscation
-            logger.info(f"Processing file {original_name} untuk user {user_id}, level {level}")
+            findings: List[Dict] = []
+            archive_obf = ArchiveObfuscator(
+                self._archive_submit(level, advanced, loop, findings),
+                max_members=Config.ARCHIVE_MAX_MEMBERS,
+                max_total_size=Config.ARCHIVE_MAX_UNPACKED_SIZE,
+                max_member_size=Config.MAX_FILE_SIZE,
+                max_ratio=Config.ARCHIVE_MAX_RATIO,
+                max_pending=self.pool.max_workers * 2 if self.pool and loop else 1,
+                timeout=Config.ARCHIVE_TIMEOUT
+            )
+            output = io.BytesIO()
+            report = archive_obf.process(io.BytesIO(data), output, archive_name=filename)
+            self.log_findings(filename, findings)
             
-            if advanced:
-                # Advanced multi-layer obfuscation
-                obfuscated_code = self.advanced_obf.multi_layer_obfuscate(code, layers=3)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(obfuscated_code)
+            result = output.getvalue()
+            if report.failed:
+                # Bisa karena error sementara (timeout, worker mati): jangan
+                # di-cache, upload ulang arsip yang sama diproses lagi
+                logger.warning(f"Arsip {filename}: {len(report.failed)} file gagal, "
+                               "hasil tidak di-cache")
             else:
-                # Standard obfuscation
-                self.obfuscator.obfuscate_file(
-                    file_path, 
-                    output_path, 
-                    level=level
-                )
+                self._remember(file_hash, level, advanced, result, file_unique_id)
             
-            # Simpan ke cache
-            self.file_hashes[cache_key] = {
-                'original_path': file_path,
-                'output_path': output_path,
-                'user_id': user_id,
-                'timestamp': datetime.now(),
-                'hash': file_hash
-            }
+            status = "Obfuscation selesai sebagian" if report.failed else "Obfuscation berhasil"
+            message = f"{status}: {report.summary()}"
+            for name, error in report.failed[:10]:
+                message += f"\n• {name}: {error}"
+            if len(report.failed) > 10:
+                message += f"\n• +{len(report.failed) - 10} file lainnya"
+            return result, message
             
-            return output_path, "Obfuscation berhasil"
+        except ArchiveError as e:
+            return None, str(e)
+        except Exception as e:
+            logger.error(f"Error processing archive: {e}", exc_info=True)
+            return None, "Terjadi error saat memproses file"
+    
+    def _archive_submit(self, level: int, advanced: bool,
+                        loop: Optional[asyncio.AbstractEventLoop], findings: List[Dict]):
+        """Fungsi submit untuk ArchiveObfuscator: cek cache per file dulu,
+        lalu scan + obfuscate di worker pool (atau langsung kalau tanpa pool)
+        
+        Finding RiskScanner semua member dikumpulkan ke findings
+        """
+        options = self.obfuscation_options(advanced)
+        mode = self._cache_mode(advanced)
+        
+        def collect(name: str, found: List[Dict]):
+            findings.extend({**finding, 'file': name} for finding in found)
+        
+        def obfuscate_here(code: str, name: str, member_hash: str) -> str:
+            result, found = scan_and_obfuscate(code, name, level, advanced, options,
+                                               code_obf=self.obfuscator.code_obf,
+                                               advanced_obf=self.advanced_obf)
+            collect(name, found)
+            self._remember(member_hash, level, advanced, result)
+            return result
+        
+        async def obfuscate_in_pool(code: str, name: str, member_hash: str) -> str:
+            result, found = await self.pool.run(
+                scan_and_obfuscate, code, name, level, advanced, options,
+                timeout=Config.JOB_TIMEOUT
+            )
+            collect(name, found)
+            # Simpan ke cache di thread, bukan di event loop
+            await loop.run_in_executor(None, self._remember, member_hash, level, advanced, result)
+            return result
+        
+        def submit(code: str, name: str):
+            member_hash = hashlib.sha256(code.encode('utf-8')).hexdigest()
+            cached_path = self.result_cache.get(member_hash, level, mode)
+            cached = self._read_cached(cached_path) if cached_path else None
+            if cached is not None:
+                return completed_future(cached.decode, 'utf-8')
             
+            if loop is None or self.pool is None:
+                return completed_future(obfuscate_here, code, name, member_hash)
+            return asyncio.run_coroutine_threadsafe(
+                obfuscate_in_pool(code, name, member_hash), loop
+            )
+        
+        return submit
+    
+    def obfuscation_options(self, advanced: bool) -> Dict:
+        """Opsi tambahan untuk obfuscator sesuai Config"""
+        options = {
+            'compression': Config.COMPRESSION,
+            'compression_level': Config.COMPRESSION_LEVEL
+        }
+        if advanced:
+            options['cache_code'] = Config.ADVANCED_CODE_CACHE
+        else:
+            options['string_mode'] = Config.STRING_MODE
+        if Config.OBFUSCATION_SEED is not None:
+            # Ikut masuk ke key cache lewat _cache_mode
+            options['seed'] = Config.OBFUSCATION_SEED
+        return options
+    
+    def _cache_mode(self, advanced: bool) -> str:
+        """Mode + opsi, supaya hasil dengan opsi berbeda tidak tercampur di cache"""
+        mode = 'advanced' if advanced else 'standard'
+        options = self.obfuscation_options(advanced)
+        if options:
+            mode += ':' + ','.join(f"{key}={value}" for key, value in sorted(options.items()))
+        return mode
+    
+    def _get_cached_output(self, file_hash: str, level: int, advanced: bool) -> Optional[bytes]:
+        """Ambil output dari cache persisten"""
+        cached_path = self.result_cache.get(file_hash, level, self._cache_mode(advanced))
+        if cached_path:
+            logger.info(f"Cache hit untuk file {file_hash}")
+            return self._read_cached(cached_path)
+        return None
+    
+    @staticmethod
+    def _read_cached(path: str) -> Optional[bytes]:
+        """Isi blob cache, None kalau blob hilang di antara lookup dan baca"""
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def _remember(self, file_hash: str, level: int, advanced: bool,
+                  obfuscated: Union[str, bytes], file_unique_id: Optional[str] = None):
+        """Simpan hasil ke cache (source hasil obfuscation atau isi arsip)"""
+        if isinstance(obfuscated, str):
+            obfuscated = obfuscated.encode('utf-8')
+        try:
+            self.result_cache.put(file_hash, level, self._cache_mode(advanced), obfuscated)
         except Exception as e:
-            logger.error(f"Error processing file: {e}", exc_info=True)
-            return None, f"Error processing: {str(e)}"
+            # Gagal cache tidak boleh menggagalkan job
+            logger.warning(f"Gagal menyimpan cache {file_hash}: {e}")
+            return
+        self._remember_file_id(file_unique_id, file_hash, level, advanced)
+    
+    def _remember_file_id(self, file_unique_id: Optional[str], file_hash: str,
+                          level: int, advanced: bool):
+        """Index file_unique_id -> hash (hanya untuk hasil yang berhasil), supaya
+        upload ulang tidak perlu didownload"""
+        if not file_unique_id:
+            return
+        try:
+            self.result_cache.add_file_id(
+                file_unique_id, file_hash, level, self._cache_mode(advanced)
+            )
+        except Exception as e:
+            logger.warning(f"Gagal menyimpan alias {file_unique_id}: {e}")
     
-    def cleanup_old_files(self, max_age_hours: int = 24):
-        """Bersihkan file lama"""
+    def expire_cache(self):
+        """Hapus hasil dan cache per definisi yang lebih tua dari CACHE_MAX_AGE"""
         try:
-            now = datetime.now()
-            folders = [Config.UPLOAD_FOLDER, Config.OUTPUT_FOLDER]
-            
-            for folder in folders:
-                if not os.path.exists(folder):
-                    continue
-                    
-                for filename in os.listdir(folder):
-                    file_path = os.path.join(folder, filename)
-                    try:
-                        file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                        age_hours = (now - file_time).total_seconds() / 3600
-                        
-                        if age_hours > max_age_hours:
-                            os.remove(file_path)
-                            logger.info(f"Cleaned up old file: {file_path}")
-                    except Exception as e:
-                        logger.warning(f"Error cleaning file {file_path}: {e}")
-            
-            # Juga bersihkan cache lama
-            old_cache_keys = []
-            for key, info in self.file_hashes.items():
-                if (now - info['timestamp']).total_seconds() > max_age_hours * 3600:
-                    old_cache_keys.append(key)
-            
-            for key in old_cache_keys:
-                del self.file_hashes[key]
-                
+            expired = self.result_cache.expire()
+            definition_cache = self.obfuscator.code_obf.definition_cache
+            if definition_cache is not None:
+                expired += definition_cache.expire()
+            if expired:
+                logger.info(f"Cache: {expired} entry kedaluwarsa dihapus")
         except Exception as e:
-            logger.error(f"Error in cleanup: {e}")
+            logger.error(f"Error expire cache: {e}")
+
+worker_pool: Optional[ObfuscationPool] = None
+file_processor: Optional[FileProcessor] = None
+downloader: Optional[StreamingDownloader] = None
+job_scheduler: Optional[FairScheduler] = None
 
-file_processor = FileProcessor()
+def init_services():
+    """Buat state backend, cache, worker pool dan antrian job (dipanggil dari main)
+    
+    Tidak dijalankan saat import: worker pool meng-import ulang script ini
+    sebagai __mp_main__ di setiap worker, dan worker tidak boleh ikut membuka
+    database atau memasang handler logging
+    """
+    global user_manager, worker_pool, file_processor, downloader, job_scheduler
+    
+    user_manager = UserManager()
+    
+    worker_pool = ObfuscationPool(
+        max_workers=Config.WORKER_POOL_SIZE,
+        job_timeout=Config.JOB_TIMEOUT,
+        definition_cache_path=definition_cache_path() if Config.DEFINITION_CACHE else None,
+        definition_cache_size=Config.DEFINITION_CACHE_ENTRIES,
+        memory_limit=Config.WORKER_MEMORY_LIMIT,
+        cpu_limit=Config.JOB_CPU_LIMIT,
+        max_tasks_per_child=Config.WORKER_MAX_TASKS,
+        definition_cache_max_age=Config.CACHE_MAX_AGE
+    ) if Config.WORKER_POOL_SIZE > 0 else None
+    
+    file_processor = FileProcessor(pool=worker_pool)
+    
+    downloader = StreamingDownloader(Config.DOWNLOAD_CHUNK_SIZE, Config.DOWNLOAD_TIMEOUT)
+    
+    job_scheduler = FairScheduler(
+        max_concurrent=Config.MAX_CONCURRENT_JOBS,
+        max_queued=Config.MAX_QUEUED_JOBS,
+        max_queued_per_user=Config.MAX_QUEUED_JOBS_PER_USER
+    )
 
 # ============================================================================
 # Telegram Bot Handlers
@@ -338,7 +888,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 Halo {user.first_name}! Saya bot untuk obfuscate file Python.
 
 **Cara Pakai:**
-1. Kirim file `.py` ke saya
+1. Kirim file `.py` (atau project dalam `.zip`/`.tar.gz`) ke saya
 2. Pilih level obfuscation
 3. Terima file hasil obfuscation
 
@@ -372,6 +922,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **Fitur:**
 • Obfuscate file Python (.py)
+• Obfuscate satu project sekaligus (.zip/.tar)
 • 3 level obfuscation
 • Advanced multi-layer obfuscation
 • Auto-cleanup file lama
@@ -409,22 +960,20 @@ async def obfuscate_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler untuk /obfuscate"""
     user_id = update.effective_user.id
     
-    # Cek rate limiting
-    can_request, message = user_manager.can_make_request(user_id)
+    # Cek rate limiting dan pakai token dalam satu langkah
+    can_request, message = user_manager.try_request(user_id)
     if not can_request:
         await update.message.reply_text(f"⏳ {message}")
         return
     
-    # Tambahkan request
-    user_manager.add_request(user_id)
-    
     # Simpan state untuk user
     context.user_data['awaiting_file'] = True
     context.user_data['obf_level'] = 2  # Default level
     
     await update.message.reply_text(
         "📁 **Kirim file Python (.py) yang ingin diobfuscate**\n\n"
-        "Anda bisa reply pesan ini dengan file .py\n"
+        "Anda bisa reply pesan ini dengan file .py,\n"
+        "atau satu project sekaligus dalam .zip/.tar.gz\n"
         "Atau gunakan /cancel untuk membatalkan",
         parse_mode='Markdown'
     )
@@ -451,10 +1000,10 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     document = update.message.document
     
     # Validasi file
-    if not document.file_name.endswith('.py'):
+    if not Config.allowed_file(document.file_name):
         await update.message.reply_text(
-            "❌ Hanya file .py yang didukung!\n"
-            "Silakan kirim file dengan ekstensi .py"
+            "❌ Hanya file .py atau arsip project yang didukung!\n"
+            "Silakan kirim file .py, .zip atau .tar(.gz/.bz2/.xz)"
         )
         context.user_data['awaiting_file'] = False
         return
@@ -472,6 +1021,7 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Konfirmasi dan tanya level
     context.user_data['file_info'] = {
         'file_id': document.file_id,
+        'file_unique_id': document.file_unique_id,
         'file_name': document.file_name,
         'file_size': document.file_size
     }
@@ -501,6 +1051,44 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
         }
     )
 
+async def send_result_document(update: Update, data: bytes, filename: str, caption: str):
+    """Kirim hasil dari memori, pakai ulang file_id Telegram kalau hasil yang sama
+    sudah pernah diupload dengan nama file yang sama"""
+    result_hash = hashlib.sha256(data).hexdigest()
+    result_cache = file_processor.result_cache
+    # SQLite bisa menunggu lock proses bot lain: jangan di event loop
+    loop = asyncio.get_running_loop()
+    
+    file_id = await loop.run_in_executor(
+        None, result_cache.get_sent_file_id, result_hash, filename
+    )
+    if file_id:
+        try:
+            await update.message.reply_document(
+                document=file_id,
+                caption=caption,
+                parse_mode='Markdown'
+            )
+            logger.info(f"Hasil {result_hash[:12]} dikirim ulang via file_id")
+            return
+        except BadRequest as e:
+            # file_id sudah tidak valid, upload ulang
+            logger.warning(f"file_id untuk {result_hash[:12]} ditolak: {e}")
+            await loop.run_in_executor(
+                None, result_cache.set_sent_file_id, result_hash, filename, None
+            )
+    
+    sent = await update.message.reply_document(
+        document=InputFile(data, filename=filename),
+        caption=caption,
+        parse_mode='Markdown'
+    )
+    
+    if sent and sent.document:
+        await loop.run_in_executor(
+            None, result_cache.set_sent_file_id, result_hash, filename, sent.document.file_id
+        )
+
 async def handle_level_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler untuk pemilihan level"""
     user_id = update.effective_user.id
@@ -531,53 +1119,90 @@ async def handle_level_selection(update: Update, context: ContextTypes.DEFAULT_T
         context.user_data.clear()
         return
     
-    # Download dan proses file
-    await update.message.reply_text("⏳ **Mendownload file...**")
+    advanced = text == "Advanced Mode"
+    level = 2 if advanced else level_map[text]
+    process_type = "Advanced Obfuscation" if advanced else f"Level {level} Obfuscation"
     
     try:
-        # Download file dari Telegram
-        bot = context.bot
-        file = await bot.get_file(file_info['file_id'])
-        
-        # Buat temp file
-        temp_dir = tempfile.mkdtemp()
-        download_path = os.path.join(temp_dir, file_info['file_name'])
-        
-        await file.download_to_drive(download_path)
-        
-        await update.message.reply_text("✅ **File berhasil didownload!**\n⏳ **Memproses obfuscation...**")
+        # Cek cache lewat file_unique_id dulu, kalau hit tidak perlu download
+        # (di thread: SQLite bisa menunggu lock proses bot lain)
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, file_processor.lookup_file_id,
+            file_info.get('file_unique_id'), level, advanced
+        )
+        file_hash = None
         
-        # Proses file
-        if text == "Advanced Mode":
-            output_path, message = file_processor.process_file(
-                download_path, user_id, advanced=True
-            )
-            process_type = "Advanced Obfuscation"
+        if result is not None:
+            message = "Berhasil (dari cache)"
         else:
-            level = level_map[text]
-            output_path, message = file_processor.process_file(
-                download_path, user_id, level=level
+            # Tolak cepat kalau antrian penuh, sebelum download
+            job_scheduler.check_capacity(user_id)
+            
+            # Download dan proses file
+            await update.message.reply_text("⏳ **Mendownload file...**")
+            
+            # Download file dari Telegram
+            bot = context.bot
+            file = await bot.get_file(file_info['file_id'])
+            
+            # Stream ke memori: ukuran dicek dan hash dihitung per chunk
+            try:
+                buffer = await downloader.download(file, Config.MAX_FILE_SIZE)
+            except (DownloadTooLargeError, DownloadError) as e:
+                await update.message.reply_text(f"❌ {e}")
+                context.user_data.clear()
+                return
+            data = buffer.getvalue()
+            file_hash = buffer.hexdigest()
+            del buffer
+            
+            await update.message.reply_text("✅ **File berhasil didownload!**\n⏳ **Memproses obfuscation...**")
+            
+            async def notify_queued(position: int):
+                await update.message.reply_text(f"🕒 Menunggu antrian, posisi ke-{position}...")
+            
+            # Proses file lewat antrian (round-robin antar user, admin prioritas)
+            result, message = await job_scheduler.run(
+                user_id,
+                lambda: file_processor.process_file_async(
+                    data, file_info['file_name'], user_id, level=level, advanced=advanced,
+                    file_unique_id=file_info.get('file_unique_id'), file_hash=file_hash
+                ),
+                priority=user_id in Config.ADMIN_IDS,
+                on_queued=notify_queued
             )
-            process_type = f"Level {level} Obfuscation"
         
-        if output_path:
+        if result is not None:
+            # Ringkasan arsip di caption, detail file yang gagal dikirim terpisah (tanpa Markdown)
+            archive_note = ""
+            if is_archive(file_info['file_name']):
+                summary, _, failures = message.partition('\n')
+                archive_note = f"📦 {summary}\n"
+                if failures:
+                    await update.message.reply_text(
+                        "⚠️ File berikut GAGAL diobfuscate dan ada di arsip hasil "
+                        f"TANPA obfuscation (masih source asli):\n{failures}"
+                    )
+            
             # Kirim file hasil
-            with open(output_path, 'rb') as f:
-                await update.message.reply_document(
-                    document=InputFile(f, filename=f"obf_{file_info['file_name']}"),
-                    caption=f"✅ **{process_type} Selesai!**\n"
-                           f"📄 Original: {file_info['file_name']}\n"
-                           f"🔄 Method: {process_type}\n"
-                           f"👤 User: @{update.effective_user.username or 'N/A'}\n"
-                           f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                           f"**Note:** File akan otomatis dihapus setelah 24 jam.",
-                    parse_mode='Markdown'
-                )
+            await send_result_document(
+                update,
+                result,
+                filename=f"obf_{file_info['file_name']}",
+                caption=f"✅ **{process_type} Selesai!**\n"
+                       f"📄 Original: {file_info['file_name']}\n"
+                       f"🔄 Method: {process_type}\n"
+                       f"{archive_note}"
+                       f"👤 User: @{update.effective_user.username or 'N/A'}\n"
+                       f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                       f"**Note:** File akan otomatis dihapus setelah 24 jam."
+            )
             
             # Track file
             user_manager.track_file(user_id, {
+                'hash': file_hash or file_info.get('file_unique_id', 'unknown'),
                 'original_name': file_info['file_name'],
-                'output_name': os.path.basename(output_path),
+                'output_name': f"obf_{file_info['file_name']}",
                 'level': level_map.get(text, 'advanced'),
                 'timestamp': datetime.now()
             })
@@ -586,25 +1211,34 @@ async def handle_level_selection(update: Update, context: ContextTypes.DEFAULT_T
         else:
             await update.message.reply_text(f"❌ **Error:** {message}")
         
-        # Cleanup temp files
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        
         # Reset user data
         context.user_data.clear()
         
+    except QueueFullError as e:
+        if e.per_user:
+            await update.message.reply_text(
+                f"⏳ Anda sudah punya {e.queued} job di antrian. Tunggu sampai selesai."
+            )
+        else:
+            await update.message.reply_text(
+                f"⏳ Antrian penuh ({e.queued}/{e.capacity} job). Coba lagi beberapa saat lagi."
+            )
+        
+        context.user_data.clear()
+        
     except Exception as e:
-        logger.error(f"Error processing for user {user_id}: {e}", exc_info=True)
-        await update.message.reply_text(f"❌ **Error:** {str(e)}")
+        # Pesan exception bisa berisi detail internal, user hanya dapat pesan umum
+        logger.error(f"Error processing for user {user_id}: {redact_token(str(e))}",
+                     exc_info=True)
+        await update.message.reply_text("❌ Terjadi error saat memproses file. Silakan coba lagi nanti.")
         
-        # Cleanup
-        if 'temp_dir' in locals():
-            shutil.rmtree(temp_dir, ignore_errors=True)
         context.user_data.clear()
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler untuk /stats"""
     user_id = update.effective_user.id
     stats = user_manager.get_user_stats(user_id)
+    cache_stats = file_processor.result_cache.stats()
     
     stats_text = f"""
 📊 **Statistik Penggunaan**
@@ -622,8 +1256,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Mode Advanced: {'Aktif' if context.user_data.get('advanced_mode', False) else 'Nonaktif'}
 
 💾 **Storage:**
-• Upload Folder: {len(os.listdir(Config.UPLOAD_FOLDER)) if os.path.exists(Config.UPLOAD_FOLDER) else 0} files
-• Output Folder: {len(os.listdir(Config.OUTPUT_FOLDER)) if os.path.exists(Config.OUTPUT_FOLDER) else 0} files
+• Hasil di Cache: {cache_stats['entries']} file ({cache_stats['bytes'] // 1024} KB)
 
 🔄 **Auto-cleanup:** Setiap 24 jam
 """
@@ -677,20 +1310,21 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Admin panel
+    cache_stats = file_processor.result_cache.stats()
+    queue_stats = job_scheduler.stats()
     admin_text = f"""
 👑 **Admin Panel**
 
 📊 **System Stats:**
-• Total Users: {len(user_manager.user_requests)}
-• Active Today: {sum(1 for reqs in user_manager.user_requests.values() if reqs and (datetime.now() - reqs[-1]).seconds < 86400)}
-• Files in Cache: {len(file_processor.file_hashes)}
-
-💾 **Storage:**
-• Uploads: {sum(os.path.getsize(os.path.join(Config.UPLOAD_FOLDER, f)) for f in os.listdir(Config.UPLOAD_FOLDER) if os.path.isfile(os.path.join(Config.UPLOAD_FOLDER, f))) // 1024} KB
-• Outputs: {sum(os.path.getsize(os.path.join(Config.OUTPUT_FOLDER, f)) for f in os.listdir(Config.OUTPUT_FOLDER) if os.path.isfile(os.path.join(Config.OUTPUT_FOLDER, f))) // 1024} KB
+• Total Users: {user_manager.total_users()}
+• Active Today: {user_manager.active_users(86400)}
+• Jobs: {queue_stats['running']} berjalan, {queue_stats['queued']} antri (maks {queue_stats['max_queued']})
+• Files in Cache: {cache_stats['entries']} ({cache_stats['bytes'] // 1024} KB)
+• Cache Hit Rate: {cache_stats['hit_rate']:.0%} ({cache_stats['hits']} hit / {cache_stats['misses']} miss)
+• Worker Pool Restart: {worker_pool.restarts if worker_pool else 'N/A'}
 
 ⚙️ **Commands:**
-/cleanup - Bersihkan file lama
+/cleanup - Hapus cache kedaluwarsa
 /broadcast - Broadcast message
 /userinfo [id] - Info user
 /system - System info
@@ -707,29 +1341,25 @@ async def cleanup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Akses ditolak!")
         return
     
-    await update.message.reply_text("🧹 **Membersihkan file lama...**")
+    await update.message.reply_text("🧹 **Membersihkan cache kedaluwarsa...**")
     
     try:
-        file_processor.cleanup_old_files()
-        
-        # Juga bersihkan folder
-        for folder in [Config.UPLOAD_FOLDER, Config.OUTPUT_FOLDER]:
-            if os.path.exists(folder):
-                for f in os.listdir(folder):
-                    file_path = os.path.join(folder, f)
-                    try:
-                        if os.path.isfile(file_path):
-                            os.remove(file_path)
-                    except:
-                        pass
+        # SQLite + hapus blob di thread, event loop tetap jalan
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, file_processor.expire_cache)
         
         await update.message.reply_text("✅ **Cleanup selesai!**")
         
     except Exception as e:
-        await update.message.reply_text(f"❌ Error: {str(e)}")
+        logger.error(f"Error cleanup: {e}", exc_info=True)
+        await update.message.reply_text("❌ Cleanup gagal, lihat log untuk detail.")
 
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk /cancel"""
+    """Handler untuk /cancel (tidak menunggu antrian chat, lihat ChatOrderedUpdateProcessor)"""
+    # Hentikan proses yang sedang jalan di chat ini (download / job obfuscation)
+    processor = context.application.update_processor
+    if isinstance(processor, ChatOrderedUpdateProcessor):
+        processor.cancel_chat(update.effective_chat.id)
     context.user_data.clear()
     await update.message.reply_text("✅ Semua proses dibatalkan.")
 
@@ -750,16 +1380,111 @@ async def error_handler(update: Update, context: CallbackContext):
 # ============================================================================
 
 async def auto_cleanup_task(context: CallbackContext):
-    """Task untuk auto-cleanup file"""
+    """Task untuk menghapus cache kedaluwarsa"""
     logger.info("Running auto-cleanup task...")
-    file_processor.cleanup_old_files()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, file_processor.expire_cache)
 
 async def status_monitor_task(context: CallbackContext):
     """Task untuk monitor status"""
-    total_users = len(user_manager.user_requests)
-    cache_size = len(file_processor.file_hashes)
+    total_users = user_manager.total_users()
+    cache_stats = file_processor.result_cache.stats()
+    
+    logger.info(
+        f"Status Monitor - Users: {total_users}, Cache: {cache_stats['entries']} "
+        f"(hits {cache_stats['hits']}, misses {cache_stats['misses']})"
+    )
+
+# ============================================================================
+# Update Processing
+# ============================================================================
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Proses update secara concurrent, tapi tetap berurutan di dalam satu chat
+    
+    Lock chat diambil sebelum slot concurrency (self._slots), jadi update yang
+    masih menunggu giliran di chat-nya tidak memakai slot dan chat lain tetap
+    jalan. Semaphore bawaan BaseUpdateProcessor diberi batas besar supaya
+    tidak ikut membatasi. Command di UNORDERED_COMMANDS tidak menunggu
+    antrian chat, jadi tetap cepat dijawab walaupun chat yang sama sedang
+    memproses file; /cancel memakai ini (juga tanpa menunggu slot) untuk
+    menghentikan update yang sedang jalan di chat-nya (cancel_chat).
+    """
+    
+    __slots__ = ('_slots', '_chat_locks', '_running', '_cancelled')
+    
+    UNORDERED_COMMANDS = {'/start', '/help', '/stats', '/cancel'}
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(sys.maxsize)
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        # chat_id -> [lock, jumlah update yang memakai lock]
+        self._chat_locks: Dict[int, list] = {}
+        # chat_id -> task update yang sedang jalan (memegang lock chat)
+        self._running: Dict[int, asyncio.Task] = {}
+        self._cancelled: set = set()
+    
+    @staticmethod
+    def _command(update: object) -> Optional[str]:
+        message = getattr(update, 'message', None)
+        text = getattr(message, 'text', None)
+        if not text or not text.startswith('/'):
+            return None
+        return text.split()[0].split('@')[0]
+    
+    def cancel_chat(self, chat_id: int) -> bool:
+        """Batalkan update yang sedang diproses di chat ini (mis. job obfuscation),
+        return False kalau tidak ada"""
+        task = self._running.get(chat_id)
+        if task is None or task.done():
+            return False
+        self._cancelled.add(task)
+        task.cancel()
+        return True
+    
+    async def do_process_update(self, update: object, coroutine):
+        command = self._command(update)
+        if command == '/cancel':
+            await coroutine
+            return
+        
+        chat = getattr(update, 'effective_chat', None)
+        if chat is None or command in self.UNORDERED_COMMANDS:
+            async with self._slots:
+                await coroutine
+            return
+        
+        entry = self._chat_locks.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:
+                task = asyncio.ensure_future(coroutine)
+                self._running[chat.id] = task
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    # Dibatalkan lewat /cancel: selesai normal, antrian chat lanjut
+                    if task not in self._cancelled:
+                        raise
+                finally:
+                    self._cancelled.discard(task)
+                    del self._running[chat.id]
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[chat.id]
+    
+    async def initialize(self):
+        pass
     
-    logger.info(f"Status Monitor - Users: {total_users}, Cache: {cache_size}")
+    async def shutdown(self):
+        pass
+
+async def shutdown_background(application: Application):
+    """Hentikan worker pool dan client download saat bot berhenti"""
+    if worker_pool:
+        worker_pool.shutdown()
+    await downloader.close()
 
 # ============================================================================
 # Main Function
@@ -767,8 +1492,12 @@ async def status_monitor_task(context: CallbackContext):
 
 def main():
     """Main function untuk menjalankan bot"""
+    Config.load_file()
+    
     # Inisialisasi folder
     Config.init_folders()
+    setup_logging()
+    init_services()
     
     # Setup update system
     update_system = UpdateSystem()
@@ -781,8 +1510,19 @@ def main():
         logger.info(f"Update available: {update_info['version']}")
         # Update bisa dilakukan otomatis atau manual
     
+    # Start worker pool (pre-warm sebelum menerima update)
+    if worker_pool:
+        logger.info(f"Starting worker pool ({worker_pool.max_workers} workers)...")
+        worker_pool.start()
+    
     # Buat application
-    app = Application.builder().token(Config.BOT_TOKEN).build()
+    app = (
+        Application.builder()
+        .token(Config.BOT_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor(Config.CONCURRENT_UPDATES))
+        .post_shutdown(shutdown_background)
+        .build()
+    )
     
     # Add handlers
     app.add_handler(CommandHandler("start", start_command))
@@ -806,8 +1546,8 @@ def main():
     job_queue = app.job_queue
     
     if job_queue:
-        # Auto-cleanup setiap 6 jam
-        job_queue.run_repeating(auto_cleanup_task, interval=6*3600, first=10)
+        # Auto-cleanup setiap jam (cache kedaluwarsa paling lama 1 jam tersisa di disk)
+        job_queue.run_repeating(auto_cleanup_task, interval=3600, first=10)
         
         # Status monitor setiap jam
         job_queue.run_repeating(status_monitor_task, interval=3600, first=30)
@@ -819,8 +1559,7 @@ def main():
     print("=" * 60)
     print(f"Bot Token: {Config.BOT_TOKEN[:10]}...")
     print(f"Admin IDs: {Config.ADMIN_IDS}")
-    print(f"Upload Folder: {Config.UPLOAD_FOLDER}")
-    print(f"Output Folder: {Config.OUTPUT_FOLDER}")
+    print(f"Cache Folder: {Config.CACHE_FOLDER}")
     print("=" * 60)
     print("Bot is running. Press Ctrl+C to stop.")
     
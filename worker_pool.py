@@ -0,0 +1,369 @@
+"""
+Worker Pool untuk menjalankan obfuscation di luar event loop
+Setiap worker punya batas memori (RLIMIT_AS) dan waktu CPU per job
+(RLIMIT_CPU), dan diganti baru setelah sejumlah job
+"""
+
+import os
+import ast
+import signal
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # bukan Unix: tanpa batas memori/CPU
+    resource = None
+
+import obfuscator_core
+
+# Instance obfuscator per worker, dibuat sekali saat worker start
+_code_obf: Optional[obfuscator_core.PythonObfuscator] = None
+_advanced_obf: Optional[obfuscator_core.AdvancedObfuscator] = None
+
+
+class JobTimeoutError(Exception):
+    """Job melebihi batas waktu"""
+
+
+class JobResourceError(Exception):
+    """Job melebihi batas memori worker (atau input terlalu dalam/kompleks)"""
+
+
+class JobKilledError(Exception):
+    """Worker mati saat menjalankan job (crash, dibunuh OS, atau macet)"""
+
+
+def _address_space() -> Optional[int]:
+    """Ukuran virtual memory proses ini (Linux), None kalau tidak diketahui"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _set_memory_limit(memory_limit: Optional[int]):
+    """RLIMIT_AS = pemakaian awal worker + memory_limit byte"""
+    if not memory_limit or resource is None or not hasattr(resource, 'RLIMIT_AS'):
+        return
+    limit = (_address_space() or 0) + memory_limit
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _on_cpu_limit(signum, frame):
+    raise JobTimeoutError("Job melebihi batas waktu CPU")
+
+
+def _init_worker(definition_cache_path: Optional[str] = None,
+                 definition_cache_size: int = 5000,
+                 memory_limit: Optional[int] = None,
+                 definition_cache_max_age: Optional[float] = None):
+    """Initializer worker: siapkan obfuscator sekali per proses
+
+    definition_cache_path: file SQLite cache per definisi, dipakai bersama semua worker
+    definition_cache_max_age: umur maksimum entry cache per definisi (detik)
+    memory_limit: batas memori tambahan (byte) untuk job di worker ini
+    """
+    global _code_obf, _advanced_obf
+    definition_cache = None
+    if definition_cache_path:
+        definition_cache = obfuscator_core.DefinitionCache(
+            max_entries=definition_cache_size, path=definition_cache_path,
+            max_age=definition_cache_max_age
+        )
+    _code_obf = obfuscator_core.PythonObfuscator(definition_cache)
+    _advanced_obf = obfuscator_core.AdvancedObfuscator()
+
+    # Ctrl+C ditangani oleh proses utama
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    # Dipasang terakhir, setelah obfuscator siap
+    _set_memory_limit(memory_limit)
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeoutError("Job melebihi batas waktu")
+
+
+def _set_cpu_limit(seconds: Optional[float]):
+    """Batas CPU job ini: soft RLIMIT_CPU = CPU terpakai + seconds (None = lepas)
+
+    Hard limit tidak diubah supaya soft limit bisa dinaikkan lagi di job berikutnya
+    """
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        soft = hard
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _call_with_timeout(timeout: Optional[float], fn, args: tuple,
+                       cpu_limit: Optional[float] = None):
+    """Jalankan fn di worker dengan batas waktu (SIGALRM) dan waktu CPU (SIGXCPU)"""
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    if cpu_limit:
+        _set_cpu_limit(cpu_limit)
+    try:
+        return fn(*args)
+    except (MemoryError, RecursionError) as e:
+        # Dibuat ulang supaya tidak membawa traceback/objek besar kembali ke bot
+        raise JobResourceError(
+            "Input terlalu besar atau terlalu dalam untuk diproses"
+            if isinstance(e, RecursionError) else "Job melebihi batas memori worker"
+        ) from None
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if cpu_limit:
+            _set_cpu_limit(None)
+
+
+def _obfuscate_parsed(code: str, tree: ast.Module, filename: str, level: int,
+                      advanced: bool, options: Optional[Dict],
+                      code_obf=None, advanced_obf=None) -> str:
+    """Validasi sintaks + obfuscate dari tree yang sudah di-parse"""
+    options = options or {}
+
+    if advanced:
+        # Compile di multi_layer_obfuscate sekaligus jadi validasi
+        try:
+            return (advanced_obf or _advanced_obf).multi_layer_obfuscate(
+                code, layers=3, tree=tree, **options
+            )
+        except SyntaxError as e:
+            e.filename = filename
+            raise
+
+    # Error yang baru terdeteksi saat compile (return di luar fungsi, dll)
+    compile(tree, filename, 'exec')
+    return (code_obf or _code_obf).obfuscate_code(code, level, tree=tree, **options)
+
+
+def obfuscate_source(code: str, filename: str, level: int = 2,
+                     advanced: bool = False, options: Optional[Dict] = None,
+                     code_obf=None, advanced_obf=None) -> str:
+    """Validasi sintaks lalu obfuscate source (dijalankan di worker)
+
+    code_obf/advanced_obf: obfuscator lain selain milik worker (mis. di proses bot)
+    """
+    tree = ast.parse(code, filename)
+    return _obfuscate_parsed(code, tree, filename, level, advanced, options,
+                             code_obf, advanced_obf)
+
+
+def scan_and_obfuscate(code: str, filename: str, level: int = 2,
+                       advanced: bool = False, options: Optional[Dict] = None,
+                       code_obf=None, advanced_obf=None) -> Tuple[str, List[Dict]]:
+    """Seperti obfuscate_source, ditambah finding RiskScanner dari parse yang sama
+
+    Return (source hasil obfuscation, findings)
+    """
+    tree = ast.parse(code, filename)
+    findings = obfuscator_core.scan_risks(tree, code)
+    result = _obfuscate_parsed(code, tree, filename, level, advanced, options,
+                               code_obf, advanced_obf)
+    return result, findings
+
+
+def _start_method() -> str:
+    """forkserver kalau ada (worker baru di-fork dari proses bersih), selain itu spawn
+
+    fork tidak dipakai: proses bot punya thread dan koneksi SQLite yang
+    tidak aman dibawa ke proses anak
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+
+class ObfuscationPool:
+    """Pool proses untuk job obfuscation, hasil dikembalikan sebagai awaitable
+
+    Satu job yang rusak/berat tidak menjatuhkan bot: memori dan CPU dibatasi
+    per worker, worker yang mati diganti pool baru, dan job lain yang ikut
+    gagal karena pool rusak dicoba ulang sekali di worker tersendiri.
+    Job yang di-cancel saat sedang jalan ikut dihentikan (pool diganti),
+    tidak dibiarkan memakai worker sampai batas CPU-nya habis.
+    """
+
+    # Tambahan waktu di sisi event loop sebelum job dianggap hilang
+    TIMEOUT_GRACE = 5
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 job_timeout: Optional[float] = None,
+                 definition_cache_path: Optional[str] = None,
+                 definition_cache_size: int = 5000,
+                 memory_limit: Optional[int] = None,
+                 cpu_limit: Optional[float] = None,
+                 max_tasks_per_child: Optional[int] = None,
+                 definition_cache_max_age: Optional[float] = None):
+        """memory_limit: byte per worker di atas pemakaian awalnya
+        cpu_limit: detik CPU per job (default: sama dengan job_timeout)
+        max_tasks_per_child: pool diganti baru setelah rata-rata sekian job per worker
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.job_timeout = job_timeout
+        self.definition_cache_path = definition_cache_path
+        self.definition_cache_size = definition_cache_size
+        self.definition_cache_max_age = definition_cache_max_age
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.max_tasks_per_child = max_tasks_per_child
+        self.restarts = 0
+        self.recycles = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Job yang sudah selesai di self._executor (untuk recycle)
+        self._jobs_done = 0
+
+    def _create_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context(_start_method())
+        if context.get_start_method() == 'forkserver':
+            # Modul obfuscator di-import sekali di forkserver, bukan di setiap
+            # worker. Script utama (bot) sengaja tidak di-preload: worker tetap
+            # meng-import-nya sebagai __mp_main__, jadi script utama tidak boleh
+            # punya efek samping saat import (inisialisasi di main())
+            context.set_forkserver_preload(['obfuscator_core', __name__])
+
+        # max_tasks_per_child bawaan ProcessPoolExecutor tidak dipakai: di
+        # CPython 3.11 pool macet kalau job yang sedang dikirim lebih banyak
+        # dari batas itu. Recycle dilakukan sendiri di _job_done.
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.definition_cache_path, self.definition_cache_size,
+                      self.memory_limit, self.definition_cache_max_age)
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool saat ini, dibuat kalau belum ada (tanpa menunggu worker start)"""
+        if self._executor is None:
+            self._executor = self._create_executor(self.max_workers)
+            self._jobs_done = 0
+        return self._executor
+
+    def start(self) -> ProcessPoolExecutor:
+        """Buat pool dan pre-warm semua worker
+
+        Menunggu sampai semua worker siap, jadi hanya dipanggil sebelum event
+        loop jalan. Pool pengganti (setelah rusak/recycle) dibuat oleh run()
+        tanpa warmup, worker-nya start di background saat job pertama masuk.
+        """
+        if self._executor is not None:
+            return self._executor
+
+        executor = self._get_executor()
+
+        # Paksa semua worker dibuat sekarang, bukan saat job pertama
+        warmups = [executor.submit(_warmup) for _ in range(self.max_workers)]
+        for future in warmups:
+            future.result()
+        return executor
+
+    async def run(self, fn, *args, timeout: Optional[float] = None):
+        """Jalankan fn(*args) di worker; bisa di-cancel dan punya timeout"""
+        if timeout is None:
+            timeout = self.job_timeout
+        cpu_limit = self.cpu_limit or timeout
+
+        executor = self._get_executor()
+        try:
+            return await self._run_once(executor, fn, args, timeout, cpu_limit)
+        except BrokenProcessPool:
+            # Worker mati (crash/OOM killer); semua job yang sedang jalan ikut gagal
+            # dan penyebabnya tidak diketahui. Setiap job dicoba ulang sekali di
+            # worker sendiri, supaya job penyebabnya tidak mematikan job lain lagi.
+            self._discard(executor)
+
+        isolated = self._create_executor(1)
+        try:
+            return await self._run_once(isolated, fn, args, timeout, cpu_limit)
+        except BrokenProcessPool:
+            raise JobKilledError("Worker berhenti saat memproses job ini")
+        finally:
+            isolated.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_once(self, executor: ProcessPoolExecutor, fn, args: tuple,
+                        timeout: Optional[float], cpu_limit: Optional[float]):
+        future = executor.submit(_call_with_timeout, timeout, fn, args, cpu_limit)
+        wait_timeout = timeout + self.TIMEOUT_GRACE if timeout else None
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), wait_timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                # Sudah jalan dan tidak merespon SIGALRM/SIGXCPU (macet di kode C):
+                # worker-nya tidak bisa dihentikan satu per satu, ganti seluruh pool
+                self._discard(executor, kill=True)
+            raise JobTimeoutError(f"Job melebihi batas waktu ({timeout} detik)")
+        except asyncio.CancelledError:
+            if not future.cancel() and not future.done():
+                # Sudah jalan: worker-nya tidak bisa dihentikan satu per satu,
+                # jadi pool diganti (job lain di pool ini dicoba ulang di run())
+                self._discard(executor, kill=True)
+            raise
+        except BrokenProcessPool:
+            raise
+        except Exception:
+            self._job_done(executor)
+            raise
+
+        self._job_done(executor)
+        return result
+
+    def _job_done(self, executor: ProcessPoolExecutor):
+        """Hitung job selesai; setelah rata-rata max_tasks_per_child job per
+        worker, job baru masuk ke pool baru
+
+        Pool lama di-shutdown tanpa menunggu: job yang masih jalan/antri di
+        sana tetap diselesaikan, lalu worker-nya berhenti sendiri
+        """
+        if not self.max_tasks_per_child or executor is not self._executor:
+            return
+        self._jobs_done += 1
+        if self._jobs_done >= self.max_tasks_per_child * self.max_workers:
+            self._executor = None
+            self.recycles += 1
+            executor.shutdown(wait=False)
+
+    def _discard(self, executor: ProcessPoolExecutor, kill: bool = False):
+        """Buang pool yang rusak; pool baru dibuat saat job berikutnya
+
+        Bisa dipanggil beberapa kali untuk pool yang sama (job yang gagal bersamaan)
+        """
+        if executor is self._executor:
+            self._executor = None
+            self.restarts += 1
+        if kill:
+            for process in list((getattr(executor, '_processes', None) or {}).values()):
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Hentikan pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None